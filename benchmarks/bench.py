@@ -0,0 +1,258 @@
+"""
+FileZen throughput benchmarks.
+
+    # Build a reproducible corpus from dataset/images plus generated documents
+    python benchmarks/bench.py corpus bench_corpus --images 200 --documents 30 --seed 0
+
+    # Time every stage and the full organize run; write the results as JSON
+    python benchmarks/bench.py run bench_corpus --output before.json
+
+    # Compare two runs; exits with status 1 if anything regressed
+    python benchmarks/bench.py compare before.json after.json --threshold 0.10
+
+Stages are timed one file at a time (extract_text_from_file, classify_text,
+predict_image, copy, move) plus the batched APIs (predict_images,
+classify_texts) and the end-to-end organize_files run in headless mode.
+Each stage reports files/sec and p50/p95 latency; the run reports peak RSS.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+DOCUMENT_EXTENSIONS = ('.pdf', '.docx', '.txt')
+ALL_STAGES = ("extract", "classify_text", "classify_texts", "predict_image", "predict_images",
+              "copy", "move", "organize_content", "organize_extension")
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None if unavailable."""
+    try:
+        import resource
+        value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return value if sys.platform == "darwin" else value * 1024
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset
+        except (ImportError, AttributeError):
+            return None
+
+def stage_result(latencies, total_seconds, files=None):
+    """Summarize one stage from per-file latencies (or a total for batched stages)."""
+    files = len(latencies) if files is None else files
+    return {
+        "files": files,
+        "seconds": total_seconds,
+        "files_per_sec": files / total_seconds if total_seconds > 0 else None,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+    }
+
+def time_each(items, func):
+    """Call func on every item, returning per-call latencies and the total."""
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        call_start = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+def run_benchmarks(corpus_dir, stages, workers=None, batch_size=None):
+    import inference
+    from organizer import organize_files
+    from pipeline import PipelineConfig
+    from placement import Placer
+
+    names = sorted(os.listdir(corpus_dir))
+    images = [os.path.join(corpus_dir, n) for n in names if n.lower().endswith(IMAGE_EXTENSIONS)]
+    documents = [os.path.join(corpus_dir, n) for n in names if n.lower().endswith(DOCUMENT_EXTENSIONS)]
+    files = images + documents
+    batch_size = batch_size or inference.DEFAULT_BATCH_SIZE
+    config = PipelineConfig(prepare_workers=workers, batch_size=batch_size)
+    results = {}
+
+    def report(stage, result):
+        results[stage] = result
+        rate = result["files_per_sec"]
+        p95 = result["p95_ms"]
+        print(f"{stage:20s} {result['files']:6d} files  "
+              f"{rate if rate is not None else float('nan'):9.1f} files/s  "
+              f"p95 {p95 if p95 is not None else float('nan'):9.1f} ms")
+
+    texts = {}
+    if "extract" in stages or "classify_text" in stages or "classify_texts" in stages:
+        latencies, total = time_each(documents, lambda p: texts.__setitem__(p, inference.extract_text_from_file(p)))
+        if "extract" in stages:
+            report("extract", stage_result(latencies, total))
+
+    if "classify_text" in stages or "classify_texts" in stages:
+        # Load the embedding model and category embeddings outside the timings
+        inference.classify_text("warm up")
+    if "classify_text" in stages:
+        latencies, total = time_each(documents, lambda p: inference.classify_text(texts[p]))
+        report("classify_text", stage_result(latencies, total))
+    if "classify_texts" in stages:
+        start = time.perf_counter()
+        inference.classify_texts([texts[p] for p in documents], batch_size=batch_size)
+        report("classify_texts", stage_result([], time.perf_counter() - start, len(documents)))
+
+    if ("predict_image" in stages or "predict_images" in stages) and images:
+        inference.predict_image(images[0])
+    if "predict_image" in stages:
+        latencies, total = time_each(images, inference.predict_image)
+        report("predict_image", stage_result(latencies, total))
+    if "predict_images" in stages:
+        start = time.perf_counter()
+        inference.predict_images(images, batch_size=batch_size, workers=workers)
+        report("predict_images", stage_result([], time.perf_counter() - start, len(images)))
+
+    with tempfile.TemporaryDirectory(prefix="filezen-bench-") as scratch:
+        if "copy" in stages or "move" in stages:
+            # Timed through the Placer organize_files uses, with its reflink and kernel copies
+            copy_dir = os.path.join(scratch, "copy")
+            placer = Placer(copy_dir, should_copy=True)
+            latencies, total = time_each(files, lambda p: placer.place(p, os.path.join(copy_dir, os.path.basename(p))))
+            placer.close()
+            if "copy" in stages:
+                report("copy", stage_result(latencies, total))
+            if "move" in stages:
+                move_dir = os.path.join(scratch, "move")
+                placer = Placer(move_dir, should_copy=False)
+                copies = [os.path.join(copy_dir, os.path.basename(p)) for p in files]
+                latencies, total = time_each(copies, lambda p: placer.place(p, os.path.join(move_dir, os.path.basename(p))))
+                placer.close()
+                report("move", stage_result(latencies, total))
+
+        for stage, organize_by in (("organize_content", "Content"), ("organize_extension", "Extension")):
+            if stage not in stages:
+                continue
+            destination = os.path.join(scratch, stage)
+            summary = organize_files(
+                corpus_dir, destination, "Separate by Folders", organize_by, should_copy=True,
+                exclude=["manifest.json"], pipeline_config=config, use_result_cache=False,
+            )
+            report(stage, stage_result([], summary["seconds"], summary["processed"]))
+
+    return results
+
+def command_corpus(args):
+    from corpus import generate_corpus
+
+    manifest = generate_corpus(args.output_dir, args.dataset, args.images, args.documents, args.seed)
+    total_bytes = sum(entry["bytes"] for entry in manifest["files"])
+    print(f"Wrote {len(manifest['files'])} files ({total_bytes / (1024 * 1024):.1f} MB) to {args.output_dir}")
+
+def command_run(args):
+    stages = args.stages.split(",") if args.stages else ALL_STAGES
+    unknown = set(stages) - set(ALL_STAGES)
+    if unknown:
+        sys.exit(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    manifest_path = os.path.join(args.corpus_dir, "manifest.json")
+    seed = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as json_file:
+            seed = json.load(json_file).get("seed")
+
+    results = run_benchmarks(args.corpus_dir, stages, args.workers, args.batch_size)
+    report = {
+        "corpus": os.path.abspath(args.corpus_dir),
+        "seed": seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "peak_rss_bytes": peak_rss(),
+        "stages": results,
+    }
+    print(f"Peak RSS: {report['peak_rss_bytes'] / (1024 * 1024):.1f} MB" if report["peak_rss_bytes"] else "Peak RSS: n/a")
+    if args.output:
+        with open(args.output, "w") as json_file:
+            json.dump(report, json_file, indent=2)
+        print(f"Results saved to {args.output}")
+
+def command_compare(args):
+    with open(args.baseline) as json_file:
+        baseline = json.load(json_file)
+    with open(args.candidate) as json_file:
+        candidate = json.load(json_file)
+
+    regressions = []
+    for stage, before in baseline["stages"].items():
+        after = candidate["stages"].get(stage)
+        if after is None:
+            continue
+        line = f"{stage:20s}"
+        if before["files_per_sec"] and after["files_per_sec"]:
+            change = after["files_per_sec"] / before["files_per_sec"] - 1
+            line += f"  files/s {before['files_per_sec']:9.1f} -> {after['files_per_sec']:9.1f} ({change:+.1%})"
+            if change < -args.threshold:
+                regressions.append(f"{stage} throughput {change:+.1%}")
+        if before["p95_ms"] and after["p95_ms"]:
+            change = after["p95_ms"] / before["p95_ms"] - 1
+            line += f"  p95 {before['p95_ms']:8.1f} -> {after['p95_ms']:8.1f} ms ({change:+.1%})"
+            if change > args.threshold:
+                regressions.append(f"{stage} p95 latency {change:+.1%}")
+        print(line)
+
+    if baseline.get("peak_rss_bytes") and candidate.get("peak_rss_bytes"):
+        change = candidate["peak_rss_bytes"] / baseline["peak_rss_bytes"] - 1
+        print(f"{'peak RSS':20s}  {baseline['peak_rss_bytes'] / 2**20:.1f} -> "
+              f"{candidate['peak_rss_bytes'] / 2**20:.1f} MB ({change:+.1%})")
+        if change > args.threshold:
+            regressions.append(f"peak RSS {change:+.1%}")
+
+    if regressions:
+        print("Regressions: " + "; ".join(regressions))
+        sys.exit(1)
+    print("No regressions")
+
+def main():
+    parser = argparse.ArgumentParser(description="FileZen throughput benchmarks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    corpus_parser = subparsers.add_parser("corpus", help="Generate a benchmark corpus")
+    corpus_parser.add_argument("output_dir")
+    corpus_parser.add_argument("--dataset", default=os.path.join(REPO_ROOT, "dataset", "images"))
+    corpus_parser.add_argument("--images", type=int, default=100)
+    corpus_parser.add_argument("--documents", type=int, default=30,
+                               help="Number of files generated of each document type")
+    corpus_parser.add_argument("--seed", type=int, default=0)
+    corpus_parser.set_defaults(func=command_corpus)
+
+    run_parser = subparsers.add_parser("run", help="Benchmark the stages on a corpus")
+    run_parser.add_argument("corpus_dir")
+    run_parser.add_argument("--output", help="Write the results to this JSON file")
+    run_parser.add_argument("--stages", help=f"Comma-separated subset of: {', '.join(ALL_STAGES)}")
+    run_parser.add_argument("--workers", type=int, default=None)
+    run_parser.add_argument("--batch-size", type=int, default=None)
+    run_parser.set_defaults(func=command_run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two benchmark results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Relative change counted as a regression")
+    compare_parser.set_defaults(func=command_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
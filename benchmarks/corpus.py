@@ -0,0 +1,155 @@
+"""
+Generate a synthetic, reproducible benchmark corpus.
+
+Images are sampled from dataset/images and resized to a fixed set of sizes;
+PDF, docx and txt files are generated with controlled page, paragraph and
+byte counts. The same seed always produces the same corpus. A manifest.json
+describing every file is written alongside.
+"""
+import json
+import os
+import random
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+# Longest side in pixels of the generated images, used in rotation
+IMAGE_SIZES = (640, 1920, 4000)
+PDF_PAGES = (1, 10, 100)
+DOCX_PARAGRAPHS = (10, 100, 1000)
+TXT_BYTES = (2 * 1024, 64 * 1024, 1024 * 1024)
+
+# Words drawn from the text categories, so generated documents classify differently
+VOCABULARY = (
+    "chapter novel story character narrative author fiction plot "
+    "invoice receipt payment balance account bank statement total amount tax "
+    "assignment homework submission deadline university course marks question "
+    "report certificate official department reference signed document "
+    "manual installation configuration specification version system guide "
+    "research abstract methodology results experiment journal citation analysis "
+    "dear friend letter diary today feeling remember family message "
+    "magazine issue article interview edition news feature column"
+).split()
+
+LINE_WORDS = 12
+
+def _sentence(rng, words=LINE_WORDS):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path, pages):
+    """Write a minimal text-only PDF; `pages` is a list of lists of lines."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        content = "BT /F1 10 Tf 50 780 Td 12 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        content = content.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(output)
+
+def write_docx(path, paragraphs, rng):
+    import docx
+
+    document = docx.Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(_sentence(rng, 40))
+    document.save(path)
+
+def write_txt(path, num_bytes, rng):
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        while written < num_bytes:
+            line = _sentence(rng) + "\n"
+            f.write(line)
+            written += len(line)
+
+def write_image(source_path, path, longest_side):
+    from PIL import Image
+
+    with Image.open(source_path) as img:
+        img = img.convert("RGB")
+        scale = longest_side / max(img.size)
+        size = (max(1, round(img.size[0] * scale)), max(1, round(img.size[1] * scale)))
+        img = img.resize(size, Image.BILINEAR)
+        if path.endswith(".png"):
+            img.save(path)
+        else:
+            img.save(path, quality=90)
+
+def generate_corpus(output_dir, dataset_dir, images=100, documents=30, seed=0):
+    """
+    Build the corpus in output_dir and return its manifest.
+    `documents` files are generated of each kind (pdf, docx, txt), cycling
+    through the sizes above.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"seed": seed, "files": []}
+
+    def record(name, kind, size_param):
+        path = os.path.join(output_dir, name)
+        manifest["files"].append({
+            "name": name, "kind": kind, "size_param": size_param, "bytes": os.path.getsize(path),
+        })
+
+    sources = []
+    for class_name in sorted(os.listdir(dataset_dir)):
+        class_dir = os.path.join(dataset_dir, class_name)
+        if os.path.isdir(class_dir):
+            sources += [os.path.join(class_dir, f) for f in sorted(os.listdir(class_dir))
+                        if f.lower().endswith(IMAGE_EXTENSIONS)]
+    for i, source in enumerate(rng.sample(sources, min(images, len(sources)))):
+        longest_side = IMAGE_SIZES[i % len(IMAGE_SIZES)]
+        # Every fifth image is a PNG, which cannot use reduced-size decoding
+        name = f"image_{i:05d}.{'png' if i % 5 == 4 else 'jpg'}"
+        try:
+            write_image(source, os.path.join(output_dir, name), longest_side)
+            record(name, "image", longest_side)
+        except OSError as e:
+            print(f"Skipping {source}: {e}")
+
+    for i in range(documents):
+        pages = PDF_PAGES[i % len(PDF_PAGES)]
+        name = f"document_{i:05d}.pdf"
+        write_pdf(os.path.join(output_dir, name),
+                  [[_sentence(rng) for _ in range(60)] for _ in range(pages)])
+        record(name, "pdf", pages)
+
+        paragraphs = DOCX_PARAGRAPHS[i % len(DOCX_PARAGRAPHS)]
+        name = f"document_{i:05d}.docx"
+        write_docx(os.path.join(output_dir, name), paragraphs, rng)
+        record(name, "docx", paragraphs)
+
+        num_bytes = TXT_BYTES[i % len(TXT_BYTES)]
+        name = f"document_{i:05d}.txt"
+        write_txt(os.path.join(output_dir, name), num_bytes, rng)
+        record(name, "txt", num_bytes)
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as json_file:
+        json.dump(manifest, json_file, indent=2)
+    return manifest
@@ -0,0 +1,106 @@
+"""
+Compare image decode modes on accuracy and throughput.
+
+Every image under the dataset folder is decoded with each mode in
+inference.IMAGE_DECODE_MODES and classified. For each mode the script reports
+decode throughput, end-to-end throughput, top-1 agreement with the "full"
+decode and accuracy against the class folder the image sits in.
+Run from the repository root:
+
+    python benchmarks/decode_compare.py --dataset dataset/images --per-class 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import inference
+from inference import IMAGE_DECODE_MODES, load_image_array, predict_image_batch, DEFAULT_BATCH_SIZE
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+def list_dataset(dataset_dir, per_class=None):
+    """Return (path, class folder) pairs, at most per_class per folder."""
+    samples = []
+    for class_name in sorted(os.listdir(dataset_dir)):
+        class_dir = os.path.join(dataset_dir, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        files = sorted(f for f in os.listdir(class_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+        if per_class:
+            files = files[:per_class]
+        samples += [(os.path.join(class_dir, f), class_name) for f in files]
+    return samples
+
+def run_mode(samples, mode, batch_size):
+    """Decode and classify all samples with one decode mode."""
+    paths = [path for path, _ in samples]
+
+    start = time.perf_counter()
+    arrays = []
+    for path in paths:
+        try:
+            arrays.append(load_image_array(path, decode_mode=mode))
+        except Exception as e:
+            print(f"Error loading image {path}: {e}")
+            arrays.append(None)
+    decode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels = []
+    for i in range(0, len(paths), batch_size):
+        results = predict_image_batch(paths[i:i + batch_size], arrays[i:i + batch_size], batch_size)
+        labels += [label for _, label, _ in results]
+    predict_seconds = time.perf_counter() - start
+
+    return labels, decode_seconds, predict_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare image decode modes.")
+    parser.add_argument("--dataset", default=os.path.join(REPO_ROOT, "dataset", "images"))
+    parser.add_argument("--per-class", type=int, default=None, help="Limit images per class folder")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    samples = list_dataset(args.dataset, args.per_class)
+    if not samples:
+        sys.exit(f"No images found under {args.dataset}")
+    class_labels = set(inference.class_labels)
+    print(f"Comparing decode modes on {len(samples)} images")
+
+    # Load the model before timing anything
+    inference.get_registry().get("image_model")
+
+    results = {}
+    baseline = None
+    for mode in ("full",) + tuple(m for m in IMAGE_DECODE_MODES if m != "full"):
+        labels, decode_seconds, predict_seconds = run_mode(samples, mode, args.batch_size)
+        if baseline is None:
+            baseline = labels
+        agreement = sum(a == b for a, b in zip(labels, baseline)) / len(samples)
+        labelled = [(label, truth) for label, (_, truth) in zip(labels, samples) if truth in class_labels]
+        accuracy = sum(label == truth for label, truth in labelled) / len(labelled) if labelled else None
+        results[mode] = {
+            "images": len(samples),
+            "decode_seconds": decode_seconds,
+            "decode_images_per_sec": len(samples) / decode_seconds,
+            "total_images_per_sec": len(samples) / (decode_seconds + predict_seconds),
+            "agreement_with_full": agreement,
+            "accuracy": accuracy,
+        }
+        accuracy_text = f"{accuracy:.3f}" if accuracy is not None else "n/a"
+        print(f"{mode:10s} decode {results[mode]['decode_images_per_sec']:8.1f} img/s  "
+              f"total {results[mode]['total_images_per_sec']:8.1f} img/s  "
+              f"agreement {agreement:.3f}  accuracy {accuracy_text}")
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+
+if __name__ == "__main__":
+    main()
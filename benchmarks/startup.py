@@ -0,0 +1,111 @@
+"""
+Measure FileZen start-up cost.
+
+Each scenario runs in a fresh Python process and reports the wall time of the
+whole process, the time spent in the measured statements and the peak RSS.
+Run from the repository root:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --models-dir D:/models --with-models --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child process: times `code` and reports peak RSS in bytes
+CHILD_TEMPLATE = """
+import json, sys, time
+sys.path.insert(0, {repo_root!r})
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    peak_rss = peak_rss if sys.platform == "darwin" else peak_rss * 1024
+except ImportError:
+    try:
+        import psutil
+        peak_rss = psutil.Process().memory_info().peak_wset
+    except (ImportError, AttributeError):
+        peak_rss = None
+print(json.dumps({{"seconds": elapsed, "peak_rss": peak_rss}}))
+"""
+
+SCENARIOS = {
+    # What an Extension-only run pays before touching any file
+    "import_inference": "import inference",
+    # What filezen.py and the GUI import; must not pull in torch or tensorflow
+    "import_organizer": "import organizer",
+    "configure_registry": (
+        "import inference, model_registry\n"
+        "model_registry.configure({models_dir!r})"
+    ),
+}
+
+MODEL_SCENARIOS = {
+    "load_image_model": (
+        "import inference, model_registry\n"
+        "model_registry.configure({models_dir!r})\n"
+        "inference.get_registry().get('image_model')"
+    ),
+    "load_embedding_model": (
+        "import inference, model_registry\n"
+        "model_registry.configure({models_dir!r})\n"
+        "inference.get_embedding_model()"
+    ),
+}
+
+def run_scenario(code, repeat):
+    """Run `code` in `repeat` fresh interpreters and keep the fastest result."""
+    best = None
+    for _ in range(repeat):
+        child = CHILD_TEMPLATE.format(repo_root=REPO_ROOT, code=code)
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", child], capture_output=True, text=True, check=True
+        ).stdout
+        process_seconds = time.perf_counter() - start
+        result = json.loads(output.strip().splitlines()[-1])
+        result["process_seconds"] = process_seconds
+        if best is None or result["process_seconds"] < best["process_seconds"]:
+            best = result
+    return best
+
+def format_bytes(num_bytes):
+    if num_bytes is None:
+        return "n/a"
+    return f"{num_bytes / (1024 * 1024):.1f} MB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure FileZen start-up time and peak RSS.")
+    parser.add_argument("--models-dir", default=os.path.join(REPO_ROOT, "models"))
+    parser.add_argument("--with-models", action="store_true",
+                        help="Also measure loading the image and embedding models")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    scenarios = dict(SCENARIOS)
+    if args.with_models:
+        scenarios.update(MODEL_SCENARIOS)
+
+    results = {}
+    for name, code in scenarios.items():
+        result = run_scenario(code.format(models_dir=args.models_dir), args.repeat)
+        results[name] = result
+        print(f"{name:24s} process {result['process_seconds']:.3f}s  "
+              f"measured {result['seconds']:.3f}s  peak RSS {format_bytes(result['peak_rss'])}")
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(results, json_file, indent=2)
+
+if __name__ == "__main__":
+    main()
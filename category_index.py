@@ -0,0 +1,288 @@
+"""
+Persistent index of user-defined text categories.
+
+Each category holds any number of example texts (or descriptions). Their
+normalized embeddings live in one contiguous float32 file that is memory-
+mapped for search, and new examples are appended to it, so adding or removing
+a category never re-encodes the others. A text is scored against a category
+by its most similar example.
+
+    python category_index.py INDEX_DIR seed                  # start from the built-in categories
+    python category_index.py INDEX_DIR add invoices "Invoice no. 1234, amount due ..."
+    python category_index.py INDEX_DIR remove magazines
+    python category_index.py INDEX_DIR threshold 0.25        # below this score a text is "unknown"
+    python category_index.py INDEX_DIR list
+
+Once models/category_index holds categories, organize_files (and so the GUI
+and filezen.py) classifies documents with it instead of the built-in ones.
+"""
+import argparse
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+
+# Folder, under the models folder, of the index organize_files uses by default
+CATEGORY_INDEX_DIR = "category_index"
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.json"
+
+# Removed rows stay in the vectors file until they outnumber this share of the rows
+COMPACT_FRACTION = 0.25
+
+class CategoryIndex:
+    """
+    Example embeddings of text categories, stored in index_dir.
+    Args:
+        index_dir (str): Folder holding the index; created on the first change
+        encoder (callable, optional): encoder(texts) returns normalized float32
+            embeddings. Defaults to the FileZen embedding model.
+        model_name (str, optional): Name of the model behind encoder, recorded so
+            an index is not searched with embeddings from a different model
+    """
+
+    def __init__(self, index_dir, encoder=None, model_name=None):
+        self.index_dir = index_dir
+        self.index_path = os.path.join(index_dir, INDEX_FILE)
+        self._encoder = encoder
+        if model_name is None:
+            from model_registry import EMBEDDING_MODEL_NAME
+            model_name = EMBEDDING_MODEL_NAME
+        self.model_name = model_name
+        self._search_data = None
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as json_file:
+                index = json.load(json_file)
+            if index["model"] != self.model_name:
+                raise ValueError(f"Category index {self.index_dir} was built with '{index['model']}', "
+                                 f"not '{self.model_name}'")
+        else:
+            # A new id per index, so one rebuilt in the same folder never shares a key
+            index = {"id": uuid.uuid4().hex, "model": self.model_name, "dim": None, "revision": 0,
+                     "vectors_file": VECTORS_FILE, "unknown_threshold": None, "rows": [], "removed": []}
+        self._index = index
+        self._removed = set(index["removed"])
+        self._search_data = None
+
+    @classmethod
+    def from_descriptions(cls, index_dir, categories, **kwargs):
+        """Open index_dir, adding one example per category from a {name: description} dict if empty."""
+        index = cls(index_dir, **kwargs)
+        if not index.categories():
+            for name, description in categories.items():
+                index.add_examples(name, [description], save=False)
+            index.save()
+        return index
+
+    def _encode(self, texts):
+        if self._encoder is None:
+            from inference import get_embedding_model
+            model = get_embedding_model()
+            self._encoder = lambda batch: model.encode(batch, normalize_embeddings=True)
+        return np.asarray(self._encoder(list(texts)), dtype=np.float32)
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.index_dir, self._index["vectors_file"])
+
+    @property
+    def key(self):
+        """Changes with every modification; used to key cached classification results."""
+        payload = (f"{self._index.get('id', '')}:{os.path.realpath(self.index_dir)}:"
+                   f"{self.model_name}:{self._index['revision']}")
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def unknown_threshold(self):
+        return self._index["unknown_threshold"]
+
+    def set_unknown_threshold(self, threshold):
+        """Texts whose best score is below threshold are labelled "unknown"; None disables it."""
+        self._index["unknown_threshold"] = threshold
+        self.save()
+
+    def _live_rows(self):
+        return [row for row in range(len(self._index["rows"])) if row not in self._removed]
+
+    def categories(self):
+        """Category names with the number of examples each holds."""
+        counts = {}
+        for row in self._live_rows():
+            name = self._index["rows"][row][0]
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def examples(self, category):
+        return [self._index["rows"][row][1] for row in self._live_rows()
+                if self._index["rows"][row][0] == category]
+
+    def add_examples(self, category, texts, save=True):
+        """Encode texts and append them as examples of category."""
+        texts = [text for text in texts if text and text.strip()]
+        if not texts:
+            return
+        embeddings = self._encode(texts)
+        if self._index["dim"] is None:
+            self._index["dim"] = int(embeddings.shape[1])
+        elif embeddings.shape[1] != self._index["dim"]:
+            raise ValueError(f"Expected {self._index['dim']}-dimensional embeddings, got {embeddings.shape[1]}")
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        # Rows past the count in index.json (from an interrupted append) are cut off first
+        rows = len(self._index["rows"])
+        with open(self.vectors_path, "ab") as vectors_file:
+            vectors_file.truncate(rows * self._index["dim"] * 4)
+            vectors_file.write(np.ascontiguousarray(embeddings).tobytes())
+        self._index["rows"].extend([category, text] for text in texts)
+        if save:
+            self.save()
+
+    def remove_category(self, category):
+        """Drop every example of a category. Returns the number of examples removed."""
+        rows = [row for row in self._live_rows() if self._index["rows"][row][0] == category]
+        return self._remove_rows(rows)
+
+    def remove_example(self, category, text):
+        rows = [row for row in self._live_rows() if self._index["rows"][row] == [category, text]]
+        return self._remove_rows(rows)
+
+    def _remove_rows(self, rows):
+        if rows:
+            self._removed.update(rows)
+            if len(self._removed) > COMPACT_FRACTION * len(self._index["rows"]):
+                self.compact()
+            else:
+                self.save()
+        return len(rows)
+
+    def compact(self):
+        """Rewrite the vectors file without removed rows; nothing is re-encoded."""
+        live = self._live_rows()
+        vectors = self._vectors()
+        old_path = self.vectors_path
+        # A new file name, so index.json always matches the file it names
+        new_file = f"vectors-{self._index['revision'] + 1}.f32"
+        with open(os.path.join(self.index_dir, new_file), "wb") as vectors_file:
+            for start in range(0, len(live), 4096):
+                vectors_file.write(np.ascontiguousarray(vectors[live[start:start + 4096]]).tobytes())
+        del vectors
+        self._search_data = None
+        self._index["rows"] = [self._index["rows"][row] for row in live]
+        self._index["vectors_file"] = new_file
+        self._removed = set()
+        self.save()
+        if os.path.exists(old_path):
+            os.unlink(old_path)
+
+    def save(self):
+        self._index["revision"] += 1
+        self._index["removed"] = sorted(self._removed)
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as json_file:
+            json.dump(self._index, json_file)
+        os.replace(tmp_path, self.index_path)
+        self._search_data = None
+
+    def _vectors(self):
+        rows, dim = len(self._index["rows"]), self._index["dim"]
+        if not rows:
+            return np.zeros((0, dim or 0), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+
+    def _prepare_search(self):
+        """Group the live rows by category so per-category maxima are one reduceat."""
+        if self._search_data is None:
+            live = np.array(self._live_rows(), dtype=np.int64)
+            names = [self._index["rows"][row][0] for row in live]
+            category_names = sorted(set(names))
+            category_ids = np.searchsorted(np.asarray(category_names), np.asarray(names))
+            order = np.argsort(category_ids, kind="stable")
+            rows = live[order]
+            starts = np.flatnonzero(np.r_[True, np.diff(category_ids[order]) != 0]) if len(rows) else rows
+            self._search_data = (self._vectors(), rows, starts, np.asarray(category_names, dtype=object))
+        return self._search_data
+
+    def search(self, embeddings, k=1, chunk_size=256):
+        """
+        Top-k categories for each embedding.
+        Args:
+            embeddings (np.ndarray): Normalized query embeddings, shape (n, dim)
+            k (int): Categories returned per query
+            chunk_size (int): Queries scored at once; bounds memory for large indexes
+        Returns:
+            tuple: (names, scores), both shaped (n, k), best first
+        """
+        vectors, rows, starts, category_names = self._prepare_search()
+        if not len(category_names):
+            raise ValueError(f"Category index {self.index_dir} is empty")
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        k = min(k, len(category_names))
+        names = np.empty((len(embeddings), k), dtype=object)
+        scores = np.empty((len(embeddings), k), dtype=np.float32)
+        for start in range(0, len(embeddings), chunk_size):
+            queries = embeddings[start:start + chunk_size]
+            # Removed rows are scored too (they are few) and dropped by the reordering
+            similarities = (queries @ vectors.T)[:, rows]
+            per_category = np.maximum.reduceat(similarities, starts, axis=1)
+            top = np.argpartition(-per_category, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(per_category, top, axis=1)
+            ranked = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, ranked, axis=1)
+            names[start:start + len(queries)] = category_names[top]
+            scores[start:start + len(queries)] = np.take_along_axis(top_scores, ranked, axis=1)
+        return names, scores
+
+    def classify(self, embeddings, threshold=None):
+        """
+        Best category of each embedding, or "unknown" if its score is below
+        threshold (defaults to the index's unknown_threshold).
+        Returns:
+            tuple: (labels object array, scores float32 array)
+        """
+        names, scores = self.search(embeddings, k=1)
+        labels, scores = names[:, 0], scores[:, 0]
+        threshold = self.unknown_threshold if threshold is None else threshold
+        if threshold is not None:
+            labels = np.where(scores < threshold, "unknown", labels).astype(object)
+        return labels, scores
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage a FileZen text category index.")
+    parser.add_argument("index_dir")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("seed", help="Add the built-in categories to an empty index")
+    add_parser = subparsers.add_parser("add", help="Add example texts to a category")
+    add_parser.add_argument("category")
+    add_parser.add_argument("texts", nargs="*", help="Example texts; with --file, read documents instead")
+    add_parser.add_argument("--file", action="append", default=[], help="Document whose text is an example")
+    remove_parser = subparsers.add_parser("remove", help="Remove a category")
+    remove_parser.add_argument("category")
+    threshold_parser = subparsers.add_parser("threshold", help="Set the score below which texts are unknown")
+    threshold_parser.add_argument("value", type=float, nargs="?")
+    subparsers.add_parser("list", help="List the categories")
+    args = parser.parse_args()
+
+    index = CategoryIndex(args.index_dir)
+    if args.command == "seed":
+        from organizer import TEXT_CATEGORIES
+        CategoryIndex.from_descriptions(args.index_dir, TEXT_CATEGORIES)
+    elif args.command == "add":
+        from inference import extract_text_from_file
+        texts = args.texts + [extract_text_from_file(path) for path in args.file]
+        index.add_examples(args.category, texts)
+    elif args.command == "remove":
+        print(f"Removed {index.remove_category(args.category)} examples")
+    elif args.command == "threshold":
+        index.set_unknown_threshold(args.value)
+    elif args.command == "list":
+        for name, count in sorted(index.categories().items()):
+            print(f"{name:30s} {count:6d} examples")
+
+if __name__ == "__main__":
+    main()
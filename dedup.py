@@ -0,0 +1,87 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from result_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+# What happens to the other copies of a file:
+#   copy-all  place every copy like any other file, reusing the first copy's label
+#   hardlink  when copying, hard-link the other copies to the first one's placed copy
+#   skip      place only the first copy and leave the others where they are
+#   report    like copy-all, and list every group of copies in the summary
+DEDUP_POLICIES = ("copy-all", "hardlink", "skip", "report")
+
+# Bytes read from each end of a file for the partial hash
+PARTIAL_BLOCK = 64 * 1024
+
+def partial_hash(file_path, block_size=PARTIAL_BLOCK):
+    """Hash the first and last block of a file; the whole file if it is smaller than two blocks."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as file:
+        digest.update(file.read(block_size))
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        if size > block_size:
+            file.seek(max(block_size, size - block_size))
+            digest.update(file.read(block_size))
+    return digest.hexdigest()
+
+def _file_size(item):
+    return item.stat().st_size if isinstance(item, os.DirEntry) else os.path.getsize(item)
+
+def _safe_hash(hash_func, path):
+    try:
+        return hash_func(path)
+    except OSError as e:
+        logger.error("Error hashing %s: %s", path, e)
+        return None
+
+def _split_by_hash(groups, hash_func, executor):
+    """Split each (size, files) group by hash_func, keeping the hashes shared by two or more files."""
+    jobs = [(index, item) for index, (_, items) in enumerate(groups) for item in items]
+    digests = executor.map(lambda job: _safe_hash(hash_func, os.fspath(job[1])), jobs)
+    by_hash = {}
+    for (index, item), digest in zip(jobs, digests):
+        if digest is not None:
+            by_hash.setdefault((index, digest), []).append(item)
+    return [(groups[index][0], items) for (index, _), items in by_hash.items() if len(items) > 1]
+
+def find_duplicates(files, workers=4):
+    """
+    Find files with identical contents.
+    Files are compared by size and extension first, then by a hash of their
+    first and last PARTIAL_BLOCK bytes, and only the remaining candidates are
+    hashed in full. Hashing streams fixed-size chunks, so memory use does not
+    depend on file size. Empty files are never grouped.
+    Args:
+        files (list): Paths or os.DirEntry objects
+        workers (int): Threads hashing files
+    Returns:
+        list: Groups of two or more identical files, each in input order
+    """
+    by_size = {}
+    for item in files:
+        try:
+            size = _file_size(item)
+        except OSError:
+            continue
+        if size:
+            ext = os.path.splitext(os.fspath(item))[1].lower()
+            by_size.setdefault((size, ext), []).append(item)
+    groups = [(key[0], items) for key, items in by_size.items() if len(items) > 1]
+    if not groups:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        groups = _split_by_hash(groups, partial_hash, executor)
+        # Files of up to two blocks were hashed completely by partial_hash
+        small = [group for group in groups if group[0] <= 2 * PARTIAL_BLOCK]
+        large = [group for group in groups if group[0] > 2 * PARTIAL_BLOCK]
+        groups = small + _split_by_hash(large, content_hash, executor)
+
+    order = {id(item): i for i, item in enumerate(files)}
+    groups = [sorted(items, key=lambda item: order[id(item)]) for _, items in groups]
+    return sorted(groups, key=lambda items: order[id(items[0])])
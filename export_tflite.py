@@ -0,0 +1,130 @@
+"""
+Export the trained image classifier to TFLite.
+
+Writes a float16 and an int8 post-training quantized model next to
+image_classifier_model.h5. The int8 model is calibrated on images sampled from
+the training dataset. A report of top-1 agreement between each TFLite model
+and the Keras model is saved as tflite_report.json.
+
+    python export_tflite.py --dataset dataset/images --models-dir models
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from inference import (
+    load_image_array, preprocess_input, predict_image_batch, set_image_backend, set_daemon_enabled,
+    configure,
+)
+from model_registry import IMAGE_BACKENDS, IMAGE_MODEL_FILE
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+REPORT_FILE = "tflite_report.json"
+
+def sample_images(dataset_dir, count, seed=0):
+    """Pick up to `count` images spread over all class folders."""
+    paths = []
+    for class_name in sorted(os.listdir(dataset_dir)):
+        class_dir = os.path.join(dataset_dir, class_name)
+        if os.path.isdir(class_dir):
+            paths += [os.path.join(class_dir, f) for f in sorted(os.listdir(class_dir))
+                      if f.lower().endswith(IMAGE_EXTENSIONS)]
+    random.Random(seed).shuffle(paths)
+    return paths[:count]
+
+def load_batch(paths):
+    """Decode images the same way inference does, skipping unreadable ones."""
+    loaded_paths, arrays = [], []
+    for path in paths:
+        try:
+            arrays.append(load_image_array(path, decode_mode="full"))
+            loaded_paths.append(path)
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+    return loaded_paths, arrays
+
+def convert(keras_model, quantization, calibration_paths):
+    """Convert the Keras model with float16 or int8 post-training quantization."""
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        def representative_dataset():
+            for array in load_batch(calibration_paths)[1]:
+                yield [preprocess_input(np.expand_dims(array, axis=0))]
+
+        converter.representative_dataset = representative_dataset
+        # Integer kernels throughout; input and output stay float32 so the
+        # backend needs no extra handling
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    return converter.convert()
+
+def predict_all(paths, arrays, batch_size):
+    """Classify decoded images with the current backend; returns labels and seconds per image."""
+    labels = []
+    start = time.perf_counter()
+    for i in range(0, len(arrays), batch_size):
+        results = predict_image_batch(paths[i:i + batch_size], arrays[i:i + batch_size], batch_size)
+        labels += [label for _, label, _ in results]
+    return labels, (time.perf_counter() - start) / max(len(arrays), 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the image classifier to TFLite.")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--dataset", default="dataset/images")
+    parser.add_argument("--calibration-images", type=int, default=200)
+    parser.add_argument("--eval-images", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=None, help="TFLite interpreter threads")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    registry = configure(args.models_dir)
+    # Every backend is timed and compared in this process, never on a running daemon
+    set_daemon_enabled(False)
+    keras_model = tf.keras.models.load_model(os.path.join(args.models_dir, IMAGE_MODEL_FILE))
+
+    # Separate samples for calibration and for measuring agreement
+    samples = sample_images(args.dataset, args.calibration_images + args.eval_images)
+    calibration_paths = samples[:args.calibration_images]
+    eval_paths = samples[args.calibration_images:]
+
+    for quantization in ("float16", "int8"):
+        backend = f"tflite-{quantization}"
+        output_path = registry.path(IMAGE_BACKENDS[backend])
+        print(f"Converting to {backend}...")
+        tflite_model = convert(keras_model, quantization, calibration_paths)
+        with open(output_path, "wb") as f:
+            f.write(tflite_model)
+        print(f"Saved {output_path} ({len(tflite_model) / (1024 * 1024):.1f} MB)")
+
+    # Compare every backend against the Keras model on held-out images
+    eval_paths, eval_arrays = load_batch(eval_paths)
+    report = {"images": len(eval_arrays), "backends": {}}
+    keras_labels = None
+    for backend in ("keras", "tflite-float16", "tflite-int8"):
+        set_image_backend(backend, args.threads)
+        labels, seconds_per_image = predict_all(eval_paths, eval_arrays, args.batch_size)
+        if keras_labels is None:
+            keras_labels = labels
+        agreement = sum(a == b for a, b in zip(labels, keras_labels)) / max(len(labels), 1)
+        report["backends"][backend] = {
+            "model_file": IMAGE_BACKENDS[backend],
+            "size_bytes": os.path.getsize(registry.image_model_path()),
+            "top1_agreement_with_keras": agreement,
+            "ms_per_image": seconds_per_image * 1000,
+        }
+        print(f"{backend:15s} agreement {agreement:.3f}  {seconds_per_image * 1000:.1f} ms/image")
+
+    report_path = registry.path(REPORT_FILE)
+    with open(report_path, "w") as json_file:
+        json.dump(report, json_file, indent=2)
+    print(f"Agreement report saved as '{report_path}'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+
+import numpy as np
+
+from inference import load_image_array, preprocess_input
+from result_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+FEATURES_FILE = "features.npy"
+INDEX_FILE = "index.json"
+
+def list_dataset(dataset_dir, extensions=IMAGE_EXTENSIONS):
+    """Return the sorted class folders and the sorted image files (by extension) of each one."""
+    classes = sorted(d for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d)))
+    files = {
+        class_name: sorted(f for f in os.listdir(os.path.join(dataset_dir, class_name))
+                           if f.lower().endswith(extensions))
+        for class_name in classes
+    }
+    return classes, files
+
+class FeatureCache:
+    """
+    Pooled MobileNetV2 features of every training image, kept on disk.
+    Features live in a memory-mapped float32 .npy file with one row per image;
+    index.json records each image's class, size, mtime and content hash. Only
+    images that are new or changed since the last update go through the
+    convolutional base again.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.features_path = os.path.join(cache_dir, FEATURES_FILE)
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+
+    def _load_index(self):
+        if not (os.path.exists(self.index_path) and os.path.exists(self.features_path)):
+            return {"entries": {}}
+        with open(self.index_path, "r") as json_file:
+            return json.load(json_file)
+
+    def update(self, dataset_dir, extractor, batch_size=32):
+        """
+        Bring the cache in line with the dataset folder.
+        Args:
+            dataset_dir (str): Folder with one subfolder per class
+            extractor (callable): Maps a preprocessed image batch to pooled features
+            batch_size (int): Images per extractor call
+        Returns:
+            int: Number of images whose features were computed
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        old_index = self._load_index()
+        old_entries = old_index["entries"]
+        by_hash = {entry["hash"]: entry["row"] for entry in old_entries.values()}
+
+        classes, files = list_dataset(dataset_dir)
+        entries = {}
+        reuse = []      # (new row, old row)
+        compute = []    # (new row, path)
+        for class_name in classes:
+            for file_name in files[class_name]:
+                rel_path = f"{class_name}/{file_name}"
+                path = os.path.join(dataset_dir, class_name, file_name)
+                stat_result = os.stat(path)
+                row = len(entries)
+                old = old_entries.get(rel_path)
+                if old and old["size"] == stat_result.st_size and old["mtime_ns"] == stat_result.st_mtime_ns:
+                    digest = old["hash"]
+                else:
+                    digest = content_hash(path)
+                entries[rel_path] = {
+                    "class": class_name, "size": stat_result.st_size,
+                    "mtime_ns": stat_result.st_mtime_ns, "hash": digest, "row": row,
+                }
+                if digest in by_hash:
+                    reuse.append((row, by_hash[digest]))
+                else:
+                    compute.append((row, path))
+
+        unchanged = (not compute and len(entries) == len(old_entries)
+                     and all(new == old for new, old in reuse))
+        if unchanged:
+            self._write_index(classes, entries, old_index.get("dim"))
+            return 0
+
+        old_features = np.load(self.features_path, mmap_mode="r") if old_entries else None
+        dim = old_index.get("dim")
+        if dim is None:
+            dim = self._feature_dim(extractor, compute)
+
+        tmp_path = self.features_path + ".tmp.npy"
+        features = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32,
+                                             shape=(len(entries), dim))
+        for new_row, old_row in reuse:
+            features[new_row] = old_features[old_row]
+
+        computed = 0
+        unreadable = set()
+        for start in range(0, len(compute), batch_size):
+            arrays, rows = [], []
+            for row, path in compute[start:start + batch_size]:
+                try:
+                    arrays.append(load_image_array(path, decode_mode="full"))
+                    rows.append(row)
+                except Exception as e:
+                    logger.error("Error loading image %s: %s", path, e)
+                    unreadable.add(row)
+            if arrays:
+                features[rows] = extractor(preprocess_input(np.stack(arrays)))
+                computed += len(rows)
+            logger.info("Extracted features for %d/%d images", min(start + batch_size, len(compute)), len(compute))
+
+        features.flush()
+        # Release the memory maps before replacing the file (required on Windows)
+        del features, old_features
+        os.replace(tmp_path, self.features_path)
+        # Unreadable images have no features and are left out of the index
+        entries = {k: v for k, v in entries.items() if v["row"] not in unreadable}
+        self._write_index(classes, entries, dim)
+        return computed
+
+    @staticmethod
+    def _feature_dim(extractor, compute):
+        for _, path in compute:
+            try:
+                sample = preprocess_input(np.expand_dims(load_image_array(path, decode_mode="full"), axis=0))
+            except Exception:
+                continue
+            return int(np.asarray(extractor(sample)).shape[-1])
+        raise ValueError("No readable images to extract features from")
+
+    def _write_index(self, classes, entries, dim):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as json_file:
+            json.dump({"classes": classes, "dim": dim, "entries": entries}, json_file)
+        os.replace(tmp_path, self.index_path)
+
+    def load(self, validation_split=0.2):
+        """
+        Load cached features split into training and validation sets.
+        Within each class the first `validation_split` of the sorted files are
+        used for validation, matching ImageDataGenerator's split.
+        Returns:
+            tuple: (x_train, y_train, x_val, y_val, class names); labels are class indices
+        """
+        index = self._load_index()
+        classes = index["classes"]
+        features = np.load(self.features_path, mmap_mode="r")
+        class_index = {name: i for i, name in enumerate(classes)}
+
+        per_class = {name: [] for name in classes}
+        for rel_path, entry in sorted(index["entries"].items()):
+            per_class[entry["class"]].append(entry["row"])
+
+        train_rows, train_labels, val_rows, val_labels = [], [], [], []
+        for name in classes:
+            rows = per_class[name]
+            split = int(validation_split * len(rows))
+            val_rows += rows[:split]
+            val_labels += [class_index[name]] * split
+            train_rows += rows[split:]
+            train_labels += [class_index[name]] * (len(rows) - split)
+
+        return (np.asarray(features[train_rows]), np.array(train_labels, dtype=np.int64),
+                np.asarray(features[val_rows]), np.array(val_labels, dtype=np.int64), classes)
@@ -0,0 +1,148 @@
+"""
+Organize a folder from the command line, without a display.
+
+    python filezen.py SOURCE DESTINATION [--mode folders|rename] [--organize-by content|extension]
+                      [--move] [--recursive] [--workers N] [--batch-size N] [--json]
+
+    # Keep running and organize files as they land in SOURCE
+    python filezen.py SOURCE DESTINATION --watch [--poll] [--settle SECONDS]
+
+Runs the same engine as the GUI (organizer.organize_files). Exits with status
+1 if any file failed and 2 if the source folder or the category index is
+missing.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+from model_registry import IMAGE_BACKENDS
+
+MODES = {"folders": "Separate by Folders", "rename": "Include Class in File Name"}
+ORGANIZE_BY = {"content": "Content", "extension": "Extension"}
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Classify and organize the files in a folder.")
+    parser.add_argument("source", help="Folder to organize")
+    parser.add_argument("destination", help="Folder receiving the organized files")
+    parser.add_argument("--mode", choices=list(MODES), default="folders",
+                        help="'folders' sorts files into category folders; 'rename' adds the "
+                             "category to the file name")
+    parser.add_argument("--organize-by", choices=list(ORGANIZE_BY), default="content",
+                        help="Classify by content with the models, or by file extension")
+    operation = parser.add_mutually_exclusive_group()
+    operation.add_argument("--copy", dest="copy", action="store_true", default=True,
+                           help="Copy files (default)")
+    operation.add_argument("--move", dest="copy", action="store_false", help="Move files")
+    parser.add_argument("--recursive", action="store_true", help="Include subfolders")
+    parser.add_argument("--include", action="append", help="Only organize files matching this glob")
+    parser.add_argument("--exclude", action="append", help="Skip files matching this glob")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Threads decoding images and extracting text (default: CPU count)")
+    parser.add_argument("--extract-processes", type=int, default=0,
+                        help="Processes for text extraction; 0 uses the worker threads")
+    parser.add_argument("--io-workers", type=int, default=4, help="Threads copying or moving files")
+    parser.add_argument("--batch-size", type=int, default=None, help="Images per image model call")
+    parser.add_argument("--models-dir", help="Folder holding the models (default: $FILEZEN_MODELS_DIR or models/)")
+    parser.add_argument("--image-backend", choices=list(IMAGE_BACKENDS), help="Image model format")
+    parser.add_argument("--categories", metavar="INDEX_DIR",
+                        help="Classify documents with this category index (see category_index.py)")
+    parser.add_argument("--no-result-cache", action="store_true",
+                        help="Classify every file again instead of reusing earlier results")
+    parser.add_argument("--no-ocr", action="store_true",
+                        help="Do not read the text in document, note and screenshot images")
+    parser.add_argument("--dedup", choices=["copy-all", "hardlink", "skip", "report"],
+                        help="Classify identical files once; the policy decides how the other copies are placed")
+    parser.add_argument("--report", help="Write the run statistics to this .json or .csv file")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON on stdout")
+    parser.add_argument("--watch", action="store_true",
+                        help="After organizing, keep watching the source and organize new files")
+    parser.add_argument("--poll", action="store_true",
+                        help="Watch by rescanning instead of inotify (e.g. for network shares)")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between rescans")
+    parser.add_argument("--settle", type=float, default=1.0,
+                        help="Seconds a new file must stay unchanged before it is organized")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="With --watch, leave the files already in the source alone")
+    parser.add_argument("--log-level", default="INFO", help="DEBUG logs every copied or moved file")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.watch and (args.dedup or args.report):
+        # Watch batches are a few files each and the run never ends
+        parser.error("--dedup and --report cannot be combined with --watch")
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not os.path.isdir(args.source):
+        logging.error("Source path does not exist: %s", args.source)
+        return 2
+
+    # Imported here so --help works without numpy and friends
+    import inference
+    from organizer import organize_files
+    from pipeline import PipelineConfig
+    from category_index import CategoryIndex
+
+    if args.models_dir or args.image_backend:
+        inference.configure(models_dir=args.models_dir, image_backend=args.image_backend)
+    config = PipelineConfig(
+        prepare_workers=args.workers, extract_processes=args.extract_processes,
+        io_workers=args.io_workers, batch_size=args.batch_size or inference.DEFAULT_BATCH_SIZE,
+    )
+
+    args.text_categories = None
+    if args.categories:
+        try:
+            args.text_categories = CategoryIndex(args.categories)
+        except ValueError as e:
+            logging.error("%s", e)
+            return 2
+        if not args.text_categories.categories():
+            logging.error("Category index %s is missing or empty; add categories with category_index.py",
+                          args.categories)
+            return 2
+
+    if args.watch:
+        return watch(args, config)
+
+    summary = organize_files(
+        args.source, args.destination, MODES[args.mode], ORGANIZE_BY[args.organize_by],
+        should_copy=args.copy, recursive=args.recursive, include=args.include,
+        exclude=args.exclude, text_categories=args.text_categories, pipeline_config=config,
+        use_result_cache=not args.no_result_cache, report_path=args.report, dedup=args.dedup,
+        use_ocr=not args.no_ocr,
+    )
+
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        print(f"Processed {summary['processed']} files in {summary['seconds']:.1f} s: "
+              f"{summary['copied']} copied, {summary['moved']} moved, {summary['linked']} linked, "
+              f"{summary['existing']} already at destination, {summary['duplicates']} duplicates, "
+              f"{summary['errors']} errors")
+    return 1 if summary["errors"] else 0
+
+def watch(args, config):
+    from watcher import watch_and_organize
+
+    def print_batch(summary):
+        if args.json:
+            print(json.dumps(summary), flush=True)
+
+    watch_and_organize(
+        args.source, args.destination, MODES[args.mode], ORGANIZE_BY[args.organize_by],
+        should_copy=args.copy, recursive=args.recursive, include=args.include,
+        exclude=args.exclude, text_categories=args.text_categories, pipeline_config=config,
+        use_result_cache=not args.no_result_cache, initial_pass=not args.skip_existing,
+        settle_seconds=args.settle, poll_interval=args.poll_interval,
+        use_inotify=False if args.poll else None, batch_callback=print_batch,
+        use_ocr=not args.no_ocr,
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
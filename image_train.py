@@ -1,83 +1,319 @@
 import os
+import argparse
+import hashlib
+import time
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
+from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout, InputLayer
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.applications import MobileNetV2
 from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
 import json
+import logging
 
 # Path to the dataset
 dataset_path = "D:/workspace/btp/folder_manager/dataset/images"
 
 IMG_HEIGHT, IMG_WIDTH = 224, 224
 BATCH_SIZE = 32
-
-# Prepare the dataset
-train_datagen = ImageDataGenerator(
-    preprocessing_function=preprocess_input,  
-    validation_split=0.2,                   
-)
-
-# Load training and validation data
-train_generator = train_datagen.flow_from_directory(
-    dataset_path,
-    target_size=(IMG_HEIGHT, IMG_WIDTH),
-    batch_size=BATCH_SIZE,
-    class_mode="categorical",
-    subset="training",
-)
-
-validation_generator = train_datagen.flow_from_directory(
-    dataset_path,
-    target_size=(IMG_HEIGHT, IMG_WIDTH),
-    batch_size=BATCH_SIZE,
-    class_mode="categorical",
-    subset="validation",
-)
-
-# Load pre-trained MobileNetV2 as the base model
-base_model = MobileNetV2(
-    weights="imagenet",    
-    include_top=False,      
-    input_shape=(IMG_HEIGHT, IMG_WIDTH, 3),
-)
-
-# Freeze the base model layers
-base_model.trainable = False
-
-# Add custom classification layers
-model = Sequential([
-    base_model,
-    GlobalAveragePooling2D(),        
-    Dropout(0.3),                    
-    Dense(256, activation="relu"),   
-    Dropout(0.3),                    
-    Dense(train_generator.num_classes, activation="softmax"), 
-])
-
-# Step 4: Compile the model
-model.compile(
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
-    loss="categorical_crossentropy",  # Loss for multi-class classification
-    metrics=["accuracy"],
-)
-
-# Step 5: Train the model
 EPOCHS = 10
+VALIDATION_SPLIT = 0.2
+
+# Pooled MobileNetV2 features of the training images, used by --mode features
+FEATURE_CACHE_DIR = "models/feature_cache"
+
+# Preprocessed images cached by the tf.data loader
+TFDATA_CACHE_DIR = "models/tfdata_cache"
+SHUFFLE_BUFFER = 1000
+
+# Files flow_from_directory reads; the tf.data loader lists the same ones
+GENERATOR_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.ppm', '.tif', '.tiff')
+# Formats tf.io.decode_image handles; other files are decoded with PIL
+TF_DECODABLE_FORMATS = {"JPEG", "MPO", "PNG", "GIF", "BMP"}
+
+def build_base_model():
+    """Load pre-trained MobileNetV2 as the base model, with its layers frozen."""
+    base_model = MobileNetV2(
+        weights="imagenet",
+        include_top=False,
+        input_shape=(IMG_HEIGHT, IMG_WIDTH, 3),
+    )
+    # Freeze the base model layers
+    base_model.trainable = False
+    return base_model
+
+def build_head(num_classes):
+    """Custom classification layers that sit on top of the pooled base features."""
+    return [
+        Dropout(0.3),
+        Dense(256, activation="relu"),
+        Dropout(0.3),
+        # Kept in float32 so softmax stays stable under mixed precision
+        Dense(num_classes, activation="softmax", dtype="float32"),
+    ]
+
+def compile_model(model, loss="categorical_crossentropy", learning_rate=0.001):
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        loss=loss,  # Loss for multi-class classification
+        metrics=["accuracy"],
+    )
+
+def save_outputs(model, class_labels):
+    # Save the trained model
+    model.save("models/image_classifier_model.h5")
+    print("Model saved as 'image_classifier_model.h5'")
+
+    # Save the class labels to a JSON file
+    with open("models/class_labels.json", "w") as json_file:
+        json.dump(class_labels, json_file)
+    print("Class labels saved as 'class_labels.json'")
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """Print training images/sec at the end of every epoch."""
+
+    def __init__(self, num_images):
+        super().__init__()
+        self.num_images = num_images
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._start
+        print(f"Epoch {epoch + 1}: {self.num_images / seconds:.1f} images/sec")
+
+def generator_datasets(dataset_dir):
+    """Training and validation data read by ImageDataGenerator (single-threaded Python decoding)."""
+    # Prepare the dataset
+    train_datagen = ImageDataGenerator(
+        preprocessing_function=preprocess_input,
+        validation_split=VALIDATION_SPLIT,
+    )
+
+    # Load training and validation data
+    train_generator = train_datagen.flow_from_directory(
+        dataset_dir,
+        target_size=(IMG_HEIGHT, IMG_WIDTH),
+        batch_size=BATCH_SIZE,
+        class_mode="categorical",
+        subset="training",
+    )
+
+    validation_generator = train_datagen.flow_from_directory(
+        dataset_dir,
+        target_size=(IMG_HEIGHT, IMG_WIDTH),
+        batch_size=BATCH_SIZE,
+        class_mode="categorical",
+        subset="validation",
+    )
+    class_labels = list(train_generator.class_indices.keys())
+    return train_generator, validation_generator, class_labels, train_generator.samples
+
+def split_dataset_files(dataset_dir):
+    """
+    List image files with their class indices, split like ImageDataGenerator:
+    the same file extensions, and within each class the first VALIDATION_SPLIT
+    of the sorted files are validation.
+    """
+    from feature_cache import list_dataset
+
+    classes, files = list_dataset(dataset_dir, GENERATOR_EXTENSIONS)
+    train, validation = ([], []), ([], [])
+    for class_index, class_name in enumerate(classes):
+        paths = [os.path.join(dataset_dir, class_name, f) for f in files[class_name]]
+        split = int(VALIDATION_SPLIT * len(paths))
+        validation[0].extend(paths[:split])
+        validation[1].extend([class_index] * split)
+        train[0].extend(paths[split:])
+        train[1].extend([class_index] * (len(paths) - split))
+    return classes, train, validation
+
+def image_formats(paths):
+    """
+    Read the real format of each image from its header (a .jpg may hold WebP).
+    Returns (paths, formats) without the files PIL cannot open, which are reported.
+    """
+    from PIL import Image
+
+    readable, formats = [], []
+    for path in paths:
+        try:
+            with Image.open(path) as img:
+                formats.append(img.format)
+            readable.append(path)
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+    return readable, formats
+
+def _pil_decode(path):
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path.numpy().decode("utf-8")) as img:
+        return np.asarray(img.convert("RGB"))
+
+def _load_and_preprocess(path, label, native, num_classes):
+    image = tf.cond(
+        native,
+        lambda: tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False),
+        lambda: tf.py_function(_pil_decode, [path], tf.uint8),
+    )
+    image.set_shape([None, None, 3])
+    # Nearest-neighbour resize, as flow_from_directory and inference.py use
+    image = tf.image.resize(image, (IMG_HEIGHT, IMG_WIDTH), method="nearest")
+    image = preprocess_input(tf.cast(image, tf.float32))
+    return image, tf.one_hot(label, num_classes)
+
+def _make_tfdata(paths, labels, num_classes, cache_file, training):
+    label_of = dict(zip(paths, labels))
+    paths, formats = image_formats(paths)
+    labels = [label_of[path] for path in paths]
+    native = [image_format in TF_DECODABLE_FORMATS for image_format in formats]
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels, native))
+    dataset = dataset.map(
+        lambda path, label, is_native: _load_and_preprocess(path, label, is_native, num_classes),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    # Decoded images are written to a local cache file during the first epoch
+    dataset = dataset.cache(cache_file)
+    if training:
+        dataset = dataset.shuffle(SHUFFLE_BUFFER, reshuffle_each_iteration=True)
+    return dataset.batch(BATCH_SIZE).prefetch(tf.data.AUTOTUNE)
+
+def tfdata_datasets(dataset_dir, cache_dir=TFDATA_CACHE_DIR):
+    """Training and validation data read by tf.data, decoding in parallel with caching and prefetch."""
+    classes, train, validation = split_dataset_files(dataset_dir)
+
+    # The cache file name depends on the file list, so a changed dataset gets a fresh cache
+    digest = hashlib.sha256("\n".join(train[0] + validation[0]).encode("utf-8")).hexdigest()[:16]
+    os.makedirs(cache_dir, exist_ok=True)
+    train_dataset = _make_tfdata(*train, len(classes), os.path.join(cache_dir, f"train-{digest}"), True)
+    validation_dataset = _make_tfdata(*validation, len(classes), os.path.join(cache_dir, f"val-{digest}"), False)
+    return train_dataset, validation_dataset, classes, len(train[0])
+
+def load_datasets(args):
+    if args.loader == "tfdata":
+        return tfdata_datasets(args.dataset, args.tfdata_cache)
+    return generator_datasets(args.dataset)
+
+def benchmark_loaders(args):
+    """Report how many training images/sec each loader delivers, without training."""
+    for loader in ("generator", "tfdata"):
+        args.loader = loader
+        train_data, _, _, num_images = load_datasets(args)
+        # Each pass sees every training image once; the second tf.data pass reads its cache
+        for attempt in range(2):
+            seen = 0
+            start = time.perf_counter()
+            for images, _ in train_data:
+                seen += int(images.shape[0])
+                # The generator loops forever; tf.data must finish the pass to complete its cache
+                if loader == "generator" and seen >= num_images:
+                    break
+            seconds = time.perf_counter() - start
+            print(f"{loader:9s} pass {attempt + 1}: {seen / seconds:.1f} images/sec")
+
+def fine_tune(model, base_model, train_data, validation_data, args, num_images):
+    """Unfreeze the top layers of the base model and train them at a low learning rate."""
+    base_model.trainable = True
+    for layer in base_model.layers[:-args.fine_tune_layers]:
+        layer.trainable = False
+    # Batch norm statistics stay frozen, otherwise small batches wreck them
+    for layer in base_model.layers:
+        if isinstance(layer, tf.keras.layers.BatchNormalization):
+            layer.trainable = False
+
+    compile_model(model, learning_rate=1e-5)
+    model.fit(
+        train_data,
+        epochs=args.fine_tune_epochs,
+        validation_data=validation_data,
+        callbacks=[ThroughputCallback(num_images)],
+    )
+
+def train_on_images(args):
+    """Train end to end, pushing every image through the base model each epoch."""
+    if args.mixed_precision:
+        tf.keras.mixed_precision.set_global_policy("mixed_float16")
+
+    train_data, validation_data, class_labels, num_images = load_datasets(args)
+
+    # Add custom classification layers
+    base_model = build_base_model()
+    model = Sequential([base_model, GlobalAveragePooling2D()] + build_head(len(class_labels)))
+    compile_model(model)
+
+    history = model.fit(
+        train_data,
+        epochs=args.epochs,
+        validation_data=validation_data,
+        callbacks=[ThroughputCallback(num_images)],
+    )
+
+    if args.fine_tune_layers:
+        fine_tune(model, base_model, train_data, validation_data, args, num_images)
+
+    save_outputs(model, class_labels)
+
+def train_on_features(args):
+    """
+    Train only the classification head on cached base-model features.
+    The frozen base runs once per new or changed image; later runs reuse the
+    cache, so adding images or a class folder retrains in seconds.
+    """
+    from feature_cache import FeatureCache
+
+    base_model = build_base_model()
+    extractor = Sequential([base_model, GlobalAveragePooling2D()])
+
+    cache = FeatureCache(args.feature_cache)
+    computed = cache.update(args.dataset, lambda batch: extractor.predict_on_batch(batch), BATCH_SIZE)
+    print(f"Feature cache updated: {computed} images run through the base model")
+
+    x_train, y_train, x_val, y_val, class_labels = cache.load(VALIDATION_SPLIT)
+    head = Sequential([InputLayer(input_shape=(x_train.shape[1],))] + build_head(len(class_labels)))
+    compile_model(head, loss="sparse_categorical_crossentropy")
+    history = head.fit(
+        x_train, y_train,
+        epochs=args.epochs,
+        batch_size=BATCH_SIZE,
+        shuffle=True,
+        validation_data=(x_val, y_val) if len(x_val) else None,
+    )
+
+    # Put the trained head back on the base so the saved model takes images
+    model = Sequential([base_model, GlobalAveragePooling2D(), head])
+    save_outputs(model, class_labels)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the FileZen image classifier.")
+    parser.add_argument("--dataset", default=dataset_path)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--mode", choices=["images", "features"], default="images",
+                        help="'images' trains on the images every epoch; 'features' trains the "
+                             "head on cached base-model features")
+    parser.add_argument("--feature-cache", default=FEATURE_CACHE_DIR)
+    parser.add_argument("--loader", choices=["generator", "tfdata"], default="generator",
+                        help="Input pipeline for --mode images")
+    parser.add_argument("--tfdata-cache", default=TFDATA_CACHE_DIR)
+    parser.add_argument("--fine-tune-layers", type=int, default=0,
+                        help="Unfreeze this many top MobileNetV2 layers after training the head")
+    parser.add_argument("--fine-tune-epochs", type=int, default=5)
+    parser.add_argument("--mixed-precision", action="store_true",
+                        help="Train with the mixed_float16 policy")
+    parser.add_argument("--benchmark-loaders", action="store_true",
+                        help="Print images/sec of the generator and tf.data loaders and exit")
+    args = parser.parse_args()
+    # Shows the feature cache's progress
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.benchmark_loaders:
+        benchmark_loaders(args)
+    elif args.mode == "features":
+        train_on_features(args)
+    else:
+        train_on_images(args)
 
-history = model.fit(
-    train_generator,
-    epochs=EPOCHS,
-    validation_data=validation_generator,
-)
-
-# Step 6: Save the trained model
-model.save("models/image_classifier_model.h5")
-print("Model saved as 'image_classifier_model.h5'")
-
-# Save the class labels to a JSON file
-class_labels = list(train_generator.class_indices.keys())
-with open("models/class_labels.json", "w") as json_file:
-    json.dump(class_labels, json_file)
-print("Class labels saved as 'class_labels.json'")
+if __name__ == "__main__":
+    main()
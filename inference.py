@@ -1,127 +1,533 @@
-import tensorflow as tf
-from tensorflow.keras.preprocessing import image
-from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
 import numpy as np
+import hashlib
+import io
 import json
+import logging
 import os
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import struct
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import model_registry
+from model_registry import get_registry, EMBEDDING_MODEL_NAME, CLASS_LABELS_FILE
+from inference_daemon import get_daemon_client, forget_daemon_client, DaemonError
+from category_index import CategoryIndex
 
-models_dir = "D:/workspace/btp/folder_manager/models"
+logger = logging.getLogger(__name__)
 
-# Load the trained model
-model = tf.keras.models.load_model(os.path.join(models_dir, "image_classifier_model.h5"))
+# Models are loaded by the registry on first use, so importing this module
+# does not import tensorflow or sentence_transformers. Call configure() to
+# use a different models directory.
 
-# Load the class labels
-with open(os.path.join(models_dir, "class_labels.json"), "r") as json_file:
-    class_labels = json.load(json_file)
+def __getattr__(name):
+    # Keep the old module attributes working without loading anything at import
+    if name == "models_dir":
+        return get_registry().models_dir
+    if name == "model":
+        return get_registry().get("image_model")
+    if name == "class_labels":
+        return get_registry().get("class_labels")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def set_image_backend(backend, tflite_threads=None):
+    """
+    Choose the image classifier backend: "keras", "tflite-float16" or "tflite-int8".
+    TFLite backends run with tflite_threads interpreter threads (default: CPU count).
+    """
+    get_registry().set_image_backend(backend, tflite_threads)
+    # A daemon client is only valid for the models it was checked against
+    forget_daemon_client(retry_later=False)
+
+def configure(models_dir=None, image_backend=None, tflite_threads=None):
+    """Use another models directory or image backend; see model_registry.configure."""
+    registry = model_registry.configure(models_dir, image_backend, tflite_threads)
+    forget_daemon_client(retry_later=False)
+    return registry
+
+# Requests go to a running inference daemon (see inference_daemon.py) when
+# one serves the same models; FILEZEN_DAEMON=0 always computes in-process.
+_daemon_enabled = os.environ.get("FILEZEN_DAEMON", "1") != "0"
+
+def set_daemon_enabled(enabled):
+    """Allow or forbid sending requests to the inference daemon."""
+    global _daemon_enabled
+    _daemon_enabled = enabled
+
+def run_on_daemon(method, *args):
+    """
+    Call a DaemonClient method on the running daemon.
+    Returns None if there is no usable daemon or the request fails, in which
+    case the caller computes the result itself.
+    """
+    if not _daemon_enabled:
+        return None
+    registry = get_registry()
+    try:
+        # Checked on every call, so a daemon still serving a retrained model is not used
+        model_version = image_model_file_version()
+    except OSError:
+        return None
+    client = get_daemon_client(registry.models_dir, registry.image_backend, model_version)
+    if client is None:
+        return None
+    try:
+        return getattr(client, method)(*args)
+    except (OSError, ValueError, DaemonError) as e:
+        logger.warning("Inference daemon request failed, computing in-process: %s", e)
+        forget_daemon_client()
+        return None
 
 # Image dimensions
 IMG_HEIGHT, IMG_WIDTH = 224, 224
 
+def preprocess_input(x):
+    """Scale pixel values to [-1, 1], as MobileNetV2's preprocess_input does."""
+    x = np.asarray(x, dtype=np.float32)
+    return x / 127.5 - 1.0
+
+def image_model_file_version():
+    """
+    Identify the image model file of the current backend and its labels.
+    Changes whenever the model file or class_labels.json changes, e.g. after retraining.
+    """
+    registry = get_registry()
+    model_stat = os.stat(registry.image_model_path())
+    digest = hashlib.sha256(
+        f"{registry.image_backend}:{model_stat.st_size}:{model_stat.st_mtime_ns}".encode("utf-8")
+    )
+    with open(registry.path(CLASS_LABELS_FILE), "rb") as labels_file:
+        digest.update(labels_file.read())
+    return digest.hexdigest()
+
+def image_model_version():
+    """
+    Identify the image model, its labels and the image decode mode, so cached
+    predictions made with an older model are not reused.
+    """
+    digest = hashlib.sha256(image_model_file_version().encode("utf-8"))
+    # Reduced-resolution decoding can change predictions too
+    digest.update(_image_decode_mode.encode("utf-8"))
+    return digest.hexdigest()
+
+# Default number of images fed to the classifier per predict call
+DEFAULT_BATCH_SIZE = 32
+
+# How images are decoded before classification:
+#   "full"      - decode at native resolution, then resize
+#   "draft"     - let the JPEG decoder scale down by 1/2, 1/4 or 1/8 while decoding
+#   "thumbnail" - use the embedded EXIF thumbnail when it is at least the model
+#                 input size, otherwise decode as "draft"
+# Only JPEGs can be decoded at reduced size; PNG/WebP always use a full decode.
+# The model was trained on full decodes, so "full" stays the default until
+# benchmarks/decode_compare.py shows the faster modes keep its accuracy.
+IMAGE_DECODE_MODES = ("full", "draft", "thumbnail")
+_image_decode_mode = os.environ.get("FILEZEN_IMAGE_DECODE", "full")
+
+def set_image_decode_mode(mode):
+    """Choose how images are decoded for classification; see IMAGE_DECODE_MODES."""
+    global _image_decode_mode
+    if mode not in IMAGE_DECODE_MODES:
+        raise ValueError(f"Unknown image decode mode '{mode}', expected one of {IMAGE_DECODE_MODES}")
+    _image_decode_mode = mode
+
+def get_image_decode_mode():
+    return _image_decode_mode
+
+def _exif_thumbnail(img):
+    """Return the JPEG thumbnail embedded in an image's EXIF data, or None."""
+    raw = img.info.get("exif")
+    if not raw or not raw.startswith(b"Exif\x00\x00"):
+        return None
+    tiff = raw[6:]
+    try:
+        order = "<" if tiff[:2] == b"II" else ">"
+        # IFD0 is followed by the offset of IFD1, which describes the thumbnail
+        ifd0 = struct.unpack_from(order + "I", tiff, 4)[0]
+        count = struct.unpack_from(order + "H", tiff, ifd0)[0]
+        ifd1 = struct.unpack_from(order + "I", tiff, ifd0 + 2 + 12 * count)[0]
+        if not ifd1:
+            return None
+        offset = length = None
+        for i in range(struct.unpack_from(order + "H", tiff, ifd1)[0]):
+            tag, _, _, value = struct.unpack_from(order + "HHII", tiff, ifd1 + 2 + 12 * i)
+            if tag == 0x0201:    # JPEGInterchangeFormat
+                offset = value
+            elif tag == 0x0202:  # JPEGInterchangeFormatLength
+                length = value
+        if offset is None or not length:
+            return None
+        return tiff[offset:offset + length]
+    except struct.error:
+        return None
+
+def _resize_to_array(img):
+    """Convert a PIL image to an RGB float array of the model input size."""
+    from PIL import Image
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if img.size != (IMG_WIDTH, IMG_HEIGHT):
+        img = img.resize((IMG_WIDTH, IMG_HEIGHT), Image.NEAREST)
+    return np.asarray(img, dtype=np.float32)
+
+def load_image_array(image_path, decode_mode=None):
+    """
+    Load an image from disk and resize it to the model input size.
+    Args:
+        image_path (str): The image to load
+        decode_mode (str, optional): One of IMAGE_DECODE_MODES. Defaults to the
+            mode set with set_image_decode_mode().
+    """
+    from PIL import Image
+
+    decode_mode = decode_mode or _image_decode_mode
+    with Image.open(image_path) as img:
+        if img.format == "JPEG" and decode_mode != "full":
+            if decode_mode == "thumbnail":
+                thumbnail = _exif_thumbnail(img)
+                if thumbnail:
+                    try:
+                        with Image.open(io.BytesIO(thumbnail)) as thumb:
+                            if thumb.size[0] >= IMG_WIDTH and thumb.size[1] >= IMG_HEIGHT:
+                                return _resize_to_array(thumb)
+                    except OSError:
+                        pass
+            # Decode at the smallest DCT scale that still covers the model input
+            img.draft("RGB", (IMG_WIDTH, IMG_HEIGHT))
+        return _resize_to_array(img)
+
 def predict_image(image_path):
     """Predict the class of an image using the trained model."""
     # Load and preprocess the image
-    img = image.load_img(image_path, target_size=(IMG_HEIGHT, IMG_WIDTH))
-    img_array = image.img_to_array(img)
+    img_array = load_image_array(image_path)
+    result = run_on_daemon("predict_images", [img_array])
+    if result is not None:
+        return result[0][0]
     img_array = np.expand_dims(img_array, axis=0)
     img_array = preprocess_input(img_array)
 
     # Make predictions
-    predictions = model.predict(img_array)
+    registry = get_registry()
+    predictions = registry.get("image_model").predict(img_array)
     predicted_class = np.argmax(predictions, axis=1)[0]
-    predicted_label = class_labels[predicted_class]
+    predicted_label = registry.get("class_labels")[predicted_class]
 
     return predicted_label
 
-# Initialize the sentence transformer model for embeddings
-# This will be lazily loaded only when needed
-_embedding_model = None
+def _safe_load_image_array(image_path):
+    """Decode an image for batching, returning None if it cannot be read."""
+    try:
+        return load_image_array(image_path)
+    except Exception as e:
+        logger.error("Error loading image %s: %s", image_path, e)
+        return None
+
+def predict_image_batch(paths, arrays, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Run the classifier on images that are already decoded.
+    Args:
+        paths (list): Paths of the images, used to label the results
+        arrays (list): Arrays from load_image_array, or None for images that failed to decode
+        batch_size (int): Batch size the model is fed with
+    Returns:
+        list: (path, label, confidence) tuples in the same order as paths
+    """
+    valid = [i for i, arr in enumerate(arrays) if arr is not None]
+    results = [(path, "unknown", 0.0) for path in paths]
+    if not valid:
+        return results
+
+    remote = run_on_daemon("predict_images", [arrays[i] for i in valid])
+    if remote is not None:
+        for i, (label, confidence) in zip(valid, remote):
+            results[i] = (paths[i], label, confidence)
+        return results
+
+    # Always feed a full batch so the model sees a single input shape;
+    # the last, partial batch is padded with zeros and the padding is discarded.
+    batch = np.zeros((max(batch_size, len(valid)), IMG_HEIGHT, IMG_WIDTH, 3), dtype=np.float32)
+    for row, i in enumerate(valid):
+        batch[row] = arrays[i]
+    batch = preprocess_input(batch)
+
+    registry = get_registry()
+    class_labels = registry.get("class_labels")
+    predictions = np.asarray(registry.get("image_model").predict_on_batch(batch))[:len(valid)]
+    predicted_classes = np.argmax(predictions, axis=1)
+    for row, i in enumerate(valid):
+        predicted_class = predicted_classes[row]
+        results[i] = (paths[i], class_labels[predicted_class], float(predictions[row, predicted_class]))
+    return results
+
+def iter_predict_images(image_paths, batch_size=DEFAULT_BATCH_SIZE, workers=None, prefetch=2):
+    """
+    Classify images in fixed-size batches, decoding them in parallel.
+    While one batch is on the model, the next `prefetch` batches are decoded
+    and resized by a thread pool, so decoding and inference overlap.
+    Args:
+        image_paths (iterable): Paths of the images to classify
+        batch_size (int): Number of images per model call
+        workers (int, optional): Decoder threads. Defaults to the CPU count.
+        prefetch (int): Number of batches decoded ahead of the model
+    Yields:
+        tuple: (path, label, confidence) in the same order as image_paths.
+               Images that cannot be decoded get ("unknown", 0.0).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pending = deque()
+    paths_iter = iter(image_paths)
+
+    def submit_next_batch(executor):
+        paths = list(islice(paths_iter, batch_size))
+        if paths:
+            pending.append((paths, [executor.submit(_safe_load_image_array, p) for p in paths]))
+        return bool(paths)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in range(prefetch + 1):
+            if not submit_next_batch(executor):
+                break
+
+        while pending:
+            paths, futures = pending.popleft()
+            arrays = [future.result() for future in futures]
+            # Queue up the next batch before running the model on this one
+            submit_next_batch(executor)
+            yield from predict_image_batch(paths, arrays, batch_size)
+
+def predict_images(image_paths, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    """
+    Classify many images at once.
+    Returns:
+        list: (path, label, confidence) tuples in the same order as image_paths
+    """
+    return list(iter_predict_images(image_paths, batch_size=batch_size, workers=workers))
+
+# Default categories for text classification
+DEFAULT_TEXT_CATEGORIES = {
+    "books": "Educational materials, textbooks, novels, fiction, non-fiction literature",
+    "documents": "Official papers, reports, certificates, formal documentation",
+    "stories": "Narratives, creative writing, short stories, personal accounts",
+    "assignments": "School or university homework, projects, academic tasks",
+    "magazines": "Periodicals, articles, news publications, journals",
+    "financials": "Financial statements, invoices, receipts, banking documents",
+    "slips": "Short receipts, tickets, brief documentation, small notes",
+    "technical": "Technical documentation, manuals, specifications, guides",
+    "personal": "Personal letters, notes, diaries, messages",
+    "academic": "Research papers, scholarly articles, academic publications"
+}
+
+# Maximum number of characters of a document used for classification
+MAX_TEXT_CHARS = 5000
 
 def get_embedding_model():
     """
     Get or initialize the embedding model.
     First tries to load from local models directory, then downloads if not found.
     """
-    global _embedding_model
-    if _embedding_model is None:
-        # Define local model path
-        model_name = 'paraphrase-MiniLM-L6-v2'   # --------embedding model---------
-        local_model_path = os.path.join(models_dir, model_name)
-        
-        # Try loading from local path first
-        try:
-            if os.path.exists(local_model_path):
-                print(f"Loading embedding model from local path: {local_model_path}")
-                _embedding_model = SentenceTransformer(local_model_path)
-            else:
-                # Download and save the model
-                print(f"Downloading embedding model '{model_name}' (this may take a while)...")
-                _embedding_model = SentenceTransformer(model_name)
-                
-                # Save the model for future use
-                os.makedirs(local_model_path, exist_ok=True)
-                _embedding_model.save(local_model_path)
-                print(f"Model saved to: {local_model_path}")
-        except Exception as e:
-            print(f"Error loading embedding model: {e}")
-            # Fallback to direct loading
-            _embedding_model = SentenceTransformer(model_name)
-    
-    return _embedding_model
+    return get_registry().get("embedding_model")
+
+# Category embeddings are cached per (categories, model) pair: in memory with
+# LRU eviction, and on disk under models_dir so later runs skip the encoding.
+CATEGORY_CACHE_SIZE = 16
+_category_embedding_cache = OrderedDict()
+_category_cache_lock = threading.Lock()
+
+def category_set_key(categories, model_name=EMBEDDING_MODEL_NAME):
+    """Return a stable hash identifying a category set and the model that encodes it."""
+    if isinstance(categories, CategoryIndex):
+        return categories.key
+    payload = json.dumps({"model": model_name, "categories": categories}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _category_cache_path(key):
+    return get_registry().path("category_embeddings", f"{key}.npz")
+
+def _load_category_embeddings(key, category_names):
+    """Load cached category embeddings from disk, or None if missing or stale."""
+    path = _category_cache_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            if list(data["names"]) != category_names:
+                return None
+            return data["embeddings"].astype(np.float32)
+    except Exception as e:
+        logger.warning("Ignoring unreadable category embedding cache %s: %s", path, e)
+        return None
+
+def _save_category_embeddings(key, category_names, embeddings):
+    """Write category embeddings to disk atomically."""
+    path = _category_cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, names=np.array(category_names), embeddings=embeddings)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Could not save category embeddings to %s: %s", path, e)
+
+def get_category_embeddings(categories=None):
+    """
+    Get the L2-normalized embeddings for a set of categories.
+    Args:
+        categories (dict, optional): Dictionary of categories and their descriptions.If None, default categories will be used.
+    Returns:
+        tuple: (list of category names, float32 matrix with one normalized row per category)
+    """
+    if categories is None:
+        categories = DEFAULT_TEXT_CATEGORIES
+
+    key = category_set_key(categories)
+    with _category_cache_lock:
+        if key in _category_embedding_cache:
+            _category_embedding_cache.move_to_end(key)
+            return _category_embedding_cache[key]
+
+    category_names = list(categories.keys())
+    embeddings = _load_category_embeddings(key, category_names)
+    if embeddings is None:
+        model = get_embedding_model()
+        embeddings = model.encode(list(categories.values()), normalize_embeddings=True)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        _save_category_embeddings(key, category_names, embeddings)
+
+    entry = (category_names, embeddings)
+    with _category_cache_lock:
+        _category_embedding_cache[key] = entry
+        _category_embedding_cache.move_to_end(key)
+        while len(_category_embedding_cache) > CATEGORY_CACHE_SIZE:
+            _category_embedding_cache.popitem(last=False)
+    return entry
 
 def classify_text(text, categories=None):
     """
     Classify text based on semantic similarity to predefined categories.
     Args:
         text (str): The text content to classify
-        categories (dict, optional): Dictionary of categories and their descriptions.If None, default categories will be used.
+        categories (dict or CategoryIndex, optional): Dictionary of categories and their descriptions,
+            or a category index. If None, default categories will be used.
     Returns:
         str: The most similar category
     """
     if not text or len(text.strip()) == 0:
         return "unknown"
-        
-    # Default categories if none provided
-    if categories is None:
-        categories = {
-            "books": "Educational materials, textbooks, novels, fiction, non-fiction literature",
-            "documents": "Official papers, reports, certificates, formal documentation",
-            "stories": "Narratives, creative writing, short stories, personal accounts",
-            "assignments": "School or university homework, projects, academic tasks",
-            "magazines": "Periodicals, articles, news publications, journals",
-            "financials": "Financial statements, invoices, receipts, banking documents",
-            "slips": "Short receipts, tickets, brief documentation, small notes",
-            "technical": "Technical documentation, manuals, specifications, guides",
-            "personal": "Personal letters, notes, diaries, messages",
-            "academic": "Research papers, scholarly articles, academic publications"
-        }
     
     # Clean and prepare the text
-    text = text[:5000]  # Limit text length for processing efficiency
+    text = text[:MAX_TEXT_CHARS]  # Limit text length for processing efficiency
+
+    if isinstance(categories, CategoryIndex):
+        labels, _ = categories.classify(get_embedding_model().encode([text], normalize_embeddings=True))
+        return labels[0]
+
+    remote = run_on_daemon("classify_texts", [text], categories)
+    if remote is not None:
+        return remote[0][0]
     
-    # Get embeddings
+    # Get embeddings; both sides are normalized so cosine similarity is a dot product
     model = get_embedding_model()
-    text_embedding = model.encode([text])
-    
-    # Get category embeddings
-    category_texts = list(categories.values())
-    category_names = list(categories.keys())
-    category_embeddings = model.encode(category_texts)
+    text_embedding = model.encode([text], normalize_embeddings=True)[0]
+    category_names, category_embeddings = get_category_embeddings(categories)
     
     # Calculate similarities
-    similarities = cosine_similarity(text_embedding, category_embeddings)[0]
+    similarities = category_embeddings @ np.asarray(text_embedding, dtype=np.float32)
     
     # Get the most similar category
     most_similar_idx = np.argmax(similarities)
     most_similar_category = category_names[most_similar_idx]
     similarity_score = similarities[most_similar_idx]
     
-    print(f"Text classified as '{most_similar_category}' with similarity score: {similarity_score:.4f}")
+    logger.debug("Text classified as '%s' with similarity score: %.4f", most_similar_category, similarity_score)
     return most_similar_category
 
-def extract_text_from_file(file_path):
-    """Extract text content from various file types."""
+def classify_texts(texts, categories=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Classify many texts at once against the same categories.
+    Texts are sorted by length before encoding so each batch holds texts of
+    similar size and little padding is wasted; all similarities are then
+    computed with a single matrix product.
+    Args:
+        texts (list): The text contents to classify
+        categories (dict or CategoryIndex, optional): Dictionary of categories and their descriptions,
+            or a category index. If None, default categories will be used.
+        batch_size (int): Number of texts encoded per batch
+    Returns:
+        tuple: (array of category names, array of similarity scores), in the same
+               order as texts. Empty texts are labelled "unknown" with score 0.
+    """
+    texts = [(text or "")[:MAX_TEXT_CHARS] for text in texts]
+    labels = np.full(len(texts), "unknown", dtype=object)
+    scores = np.zeros(len(texts), dtype=np.float32)
+
+    indices = [i for i, text in enumerate(texts) if text.strip()]
+    if not indices:
+        return labels, scores
+
+    use_index = isinstance(categories, CategoryIndex)
+    remote = None if use_index else run_on_daemon("classify_texts", [texts[i] for i in indices], categories)
+    if remote is not None:
+        for i, (label, score) in zip(indices, remote):
+            labels[i], scores[i] = label, score
+        return labels, scores
+
+    # Shortest texts first, so every batch is padded to a similar length
+    indices.sort(key=lambda i: len(texts[i]))
+
+    model = get_embedding_model()
+    text_embeddings = None
+    for start in range(0, len(indices), batch_size):
+        batch = [texts[i] for i in indices[start:start + batch_size]]
+        embeddings = model.encode(batch, batch_size=batch_size, normalize_embeddings=True)
+        if text_embeddings is None:
+            text_embeddings = np.empty((len(indices), embeddings.shape[1]), dtype=np.float32)
+        text_embeddings[start:start + len(batch)] = embeddings
+
+    if use_index:
+        labels[indices], scores[indices] = categories.classify(text_embeddings)
+        return labels, scores
+
+    category_names, category_embeddings = get_category_embeddings(categories)
+    # Cosine similarities of every text against every category
+    similarities = text_embeddings @ category_embeddings.T
+    best = np.argmax(similarities, axis=1)
+    labels[indices] = np.asarray(category_names, dtype=object)[best]
+    scores[indices] = similarities[np.arange(len(indices)), best]
+
+    logger.debug("Classified %d texts into %d categories", len(indices), len(category_names))
+    return labels, scores
+
+def _take_within_budget(parts, max_chars, max_parts=None):
+    """Join text parts, stopping once max_chars characters or max_parts parts are collected."""
+    collected = []
+    total = 0
+    for count, part in enumerate(parts, start=1):
+        if part:
+            collected.append(part)
+            total += len(part)
+        if (max_chars is not None and total >= max_chars) or (max_parts is not None and count >= max_parts):
+            break
+    text = "\n".join(collected)
+    return text[:max_chars] if max_chars is not None else text
+
+def extract_text_from_file(file_path, max_chars=MAX_TEXT_CHARS, max_pages=None, raise_errors=False):
+    """
+    Extract text content from various file types.
+    Reading stops as soon as the budget is met, so large documents only pay for
+    the text that classification actually uses.
+    Args:
+        file_path (str): The file to read
+        max_chars (int, optional): Maximum number of characters to return. None reads everything.
+        max_pages (int, optional): Maximum number of PDF pages to read
+        raise_errors (bool): Raise errors, such as a missing PyPDF2 or a broken
+            file, instead of returning ""
+    Returns:
+        str: The extracted text, or "" for unsupported or unreadable files
+    """
     _, ext = os.path.splitext(file_path)
     ext = ext.lower()
     
@@ -131,28 +537,27 @@ def extract_text_from_file(file_path):
             import PyPDF2
             with open(file_path, 'rb') as file:
                 reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-            return text
+                pages = (page.extract_text() or "" for page in reader.pages)
+                return _take_within_budget(pages, max_chars, max_pages)
         
         # Word documents
         elif ext == '.docx':
             import docx
             doc = docx.Document(file_path)
-            return "\n".join([para.text for para in doc.paragraphs])
+            paragraphs = (para.text for para in doc.paragraphs)
+            return _take_within_budget(paragraphs, max_chars)
             
         # Text files
         elif ext in ['.txt', '.md', '.csv']:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                return file.read()
+                return file.read(-1 if max_chars is None else max_chars)
         
         # Add more file types as needed
         else:
             return ""
             
     except Exception as e:
-        print(f"Error extracting text from {file_path}: {e}")
+        if raise_errors:
+            raise
+        logger.error("Error extracting text from %s: %s", file_path, e)
         return ""
-
-
@@ -0,0 +1,405 @@
+"""
+Local inference daemon that keeps the FileZen models loaded between runs.
+
+    python inference_daemon.py [--models-dir DIR] [--image-backend NAME] [--ocr]
+
+The daemon loads the image classifier, the embedding model and optionally the
+EasyOCR reader once, then serves requests over a Unix socket. Requests that
+arrive from several clients within a few milliseconds of each other are
+coalesced into shared model batches. inference.py uses the daemon
+automatically while it is running and computes in-process otherwise; set
+FILEZEN_DAEMON=0 to never use it. Daemon and clients find the socket through
+default_socket_path(); set FILEZEN_DAEMON_SOCKET for both to use another one.
+
+Messages are framed as two big-endian uint32 lengths followed by a JSON header
+and a binary payload; image batches travel as uint8 arrays.
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from model_registry import IMAGE_BACKENDS
+
+logger = logging.getLogger(__name__)
+
+def default_socket_path():
+    """$FILEZEN_DAEMON_SOCKET, or a per-user socket in the runtime or temp directory."""
+    if os.environ.get("FILEZEN_DAEMON_SOCKET"):
+        return os.environ["FILEZEN_DAEMON_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, "getuid") else os.getpid()
+    return os.path.join(runtime_dir, f"filezen-{user}.sock")
+
+# Seconds the daemon waits for other clients' requests before running a partial batch
+COALESCE_SECONDS = 0.005
+# Seconds a client waits for a reply; the first request may load the models
+CLIENT_TIMEOUT = 600
+# Seconds before a client looks for the daemon again after not finding it
+RETRY_SECONDS = 5.0
+
+_FRAME = struct.Struct(">II")
+
+class DaemonError(Exception):
+    """The daemon could not serve a request."""
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data += chunk
+    return bytes(data)
+
+def send_message(sock, header, payload=b""):
+    body = json.dumps(header).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(body), len(payload)) + body)
+    if payload:
+        sock.sendall(payload)
+
+def recv_message(sock):
+    header_size, payload_size = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+    header = json.loads(_recv_exactly(sock, header_size).decode("utf-8"))
+    payload = _recv_exactly(sock, payload_size) if payload_size else b""
+    return header, payload
+
+class _Request:
+    __slots__ = ("key", "extra", "items", "done", "result", "error")
+
+    def __init__(self, key, extra, items):
+        self.key = key
+        self.extra = extra
+        self.items = items
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class Batcher:
+    """
+    Runs one kind of model call on a worker thread, merging concurrent requests.
+    Args:
+        run (callable): run(extra, items) returns one result per item. Only
+            requests with the same key are merged, and get the first one's extra.
+        max_items (int): Stop waiting for more requests once this many items are queued
+        window (float): Seconds to wait for more requests after the first one
+    """
+
+    def __init__(self, run, max_items, window=COALESCE_SECONDS, name="filezen-batcher"):
+        self.run = run
+        self.max_items = max_items
+        self.window = window
+        self._queue = queue.Queue()
+        thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        thread.start()
+
+    def submit(self, items, key=None, extra=None):
+        """Queue items and block until their results are ready."""
+        request = _Request(key, extra, items)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _loop(self):
+        while True:
+            requests = [self._queue.get()]
+            count = len(requests[0].items)
+            deadline = time.perf_counter() + self.window
+            while count < self.max_items:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                count += len(request.items)
+
+            groups = {}
+            for request in requests:
+                groups.setdefault(request.key, []).append(request)
+            for group in groups.values():
+                self._run_group(group)
+
+    def _run_group(self, group):
+        items = [item for request in group for item in request.items]
+        try:
+            results = self.run(group[0].extra, items)
+            start = 0
+            for request in group:
+                request.result = results[start:start + len(request.items)]
+                start += len(request.items)
+        except Exception as e:
+            logger.exception("Batch of %d items failed", len(items))
+            for request in group:
+                request.error = e
+        for request in group:
+            request.done.set()
+
+class InferenceService:
+    """The models behind the daemon, with one batcher per kind of request."""
+
+    def __init__(self, batch_size=None, window=COALESCE_SECONDS):
+        import inference
+
+        # The daemon computes everything itself
+        inference.set_daemon_enabled(False)
+        self.inference = inference
+        self.batch_size = batch_size or inference.DEFAULT_BATCH_SIZE
+        self.images = Batcher(self._predict_images, self.batch_size, window, "filezen-images")
+        self.texts = Batcher(self._classify_texts, 64, window, "filezen-texts")
+        self.ocr = Batcher(self._perform_ocr, 8, window, "filezen-ocr")
+        # image_model_file_version() of the image model loaded by warm_up()
+        self.model_version = None
+
+    def warm_up(self, ocr=False):
+        registry = self.inference.get_registry()
+        logger.info("Loading models from %s", registry.models_dir)
+        # Read before loading: if the file is replaced meanwhile, clients see a mismatch
+        self.model_version = self.inference.image_model_file_version()
+        registry.get("image_model")
+        registry.get("class_labels")
+        self.inference.get_category_embeddings()
+        if ocr:
+            from ocr import get_ocr_reader
+            get_ocr_reader()
+
+    def info(self):
+        registry = self.inference.get_registry()
+        return {
+            "pid": os.getpid(),
+            "models_dir": os.path.realpath(registry.models_dir),
+            "image_backend": registry.image_backend,
+            "model_version": self.model_version,
+        }
+
+    def _predict_images(self, extra, arrays):
+        results = []
+        for start in range(0, len(arrays), self.batch_size):
+            chunk = arrays[start:start + self.batch_size]
+            results += self.inference.predict_image_batch(
+                list(range(len(chunk))), chunk, self.batch_size
+            )
+        return [[label, confidence] for _, label, confidence in results]
+
+    def _classify_texts(self, categories, texts):
+        labels, scores = self.inference.classify_texts(texts, categories)
+        return [[str(label), float(score)] for label, score in zip(labels, scores)]
+
+    def _perform_ocr(self, extra, paths):
+        from ocr import recognize_local
+        return recognize_local(paths)
+
+    def handle(self, header, payload):
+        """Serve one request and return the reply header and payload."""
+        op = header.get("op")
+        if op == "hello":
+            return self.info(), b""
+        if op == "predict_images":
+            count = header["count"]
+            arrays = np.frombuffer(payload, dtype=np.uint8).reshape(
+                count, self.inference.IMG_HEIGHT, self.inference.IMG_WIDTH, 3
+            )
+            return {"result": self.images.submit(list(arrays))}, b""
+        if op == "classify_texts":
+            categories = header.get("categories")
+            key = self.inference.category_set_key(categories) if categories else None
+            return {"result": self.texts.submit(header["texts"], key, categories)}, b""
+        if op == "ocr":
+            return {"result": self.ocr.submit(header["paths"])}, b""
+        raise DaemonError(f"Unknown request '{op}'")
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        service = self.server.service
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                reply, reply_payload = service.handle(header, payload)
+                reply["ok"] = True
+            except Exception as e:
+                reply, reply_payload = {"ok": False, "error": f"{type(e).__name__}: {e}"}, b""
+            try:
+                send_message(self.request, reply, reply_payload)
+            except OSError:
+                return
+
+def serve(socket_path=None, batch_size=None, ocr=False):
+    """Load the models and serve requests until interrupted."""
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonError("The inference daemon needs Unix domain sockets")
+    socket_path = socket_path or default_socket_path()
+    service = InferenceService(batch_size)
+    service.warm_up(ocr=ocr)
+
+    if os.path.exists(socket_path):
+        # Only replace the socket if no daemon is listening on it
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            raise DaemonError(f"A daemon is already listening on {socket_path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)
+        finally:
+            probe.close()
+
+    old_umask = os.umask(0o177)  # socket readable and writable by this user only
+    try:
+        server = socketserver.ThreadingUnixStreamServer(socket_path, _Handler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+    server.service = service
+    logger.info("Serving on %s", socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+class DaemonClient:
+    """
+    Connection to a running daemon; each thread gets its own socket.
+    Raises OSError or DaemonError when a request fails.
+    """
+
+    def __init__(self, socket_path, timeout=CLIENT_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _socket(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def request(self, header, payload=b""):
+        sock = self._socket()
+        try:
+            send_message(sock, header, payload)
+            reply, reply_payload = recv_message(sock)
+        except (OSError, ValueError):
+            self._local.sock = None
+            sock.close()
+            raise
+        if not reply.get("ok"):
+            raise DaemonError(reply.get("error", "Request failed"))
+        return reply
+
+    def hello(self):
+        return self.request({"op": "hello"})
+
+    def predict_images(self, arrays):
+        """Labels and confidences of decoded images (arrays from load_image_array)."""
+        batch = np.ascontiguousarray(np.stack(arrays), dtype=np.uint8)
+        reply = self.request({"op": "predict_images", "count": len(arrays)}, batch.tobytes())
+        return reply["result"]
+
+    def classify_texts(self, texts, categories=None):
+        return self.request({"op": "classify_texts", "texts": texts, "categories": categories})["result"]
+
+    def ocr(self, paths):
+        return self.request({"op": "ocr", "paths": [os.path.abspath(p) for p in paths]})["result"]
+
+_client = None
+# (realpath of models_dir, image_backend, model file version) served by the daemon behind _client
+_client_models = None
+_next_check = 0.0
+_client_lock = threading.Lock()
+
+def get_daemon_client(models_dir, image_backend, model_version=None):
+    """
+    Return a client for the running daemon, or None if there is none or it
+    serves different models: another models_dir or image_backend, or, after
+    retraining, an older model file than model_version (see
+    inference.image_model_file_version). Looks for the daemon at most every
+    RETRY_SECONDS.
+    """
+    global _client, _client_models, _next_check
+    models = (os.path.realpath(models_dir), image_backend, model_version)
+    client = _client
+    if client is not None and _client_models == models:
+        return client
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    with _client_lock:
+        if _client is not None:
+            if _client_models == models:
+                return _client
+            # The models were reconfigured since the client was made
+            _client = _client_models = None
+            _next_check = 0.0
+        if time.monotonic() < _next_check:
+            return None
+        _next_check = time.monotonic() + RETRY_SECONDS
+        socket_path = default_socket_path()
+        if not os.path.exists(socket_path):
+            return None
+        client = DaemonClient(socket_path)
+        try:
+            info = client.hello()
+        except (OSError, ValueError, DaemonError):
+            return None
+        if (info["models_dir"], info["image_backend"], info.get("model_version")) != models:
+            logger.info("Inference daemon %s serves other models; computing in-process", socket_path)
+            return None
+        logger.info("Using the inference daemon at %s (pid %s)", socket_path, info["pid"])
+        _client, _client_models = client, models
+        return _client
+
+def forget_daemon_client(retry_later=True):
+    """
+    Drop the client, e.g. after a failed request. The daemon is looked up again
+    after RETRY_SECONDS, or on the next request if retry_later is False.
+    """
+    global _client, _client_models, _next_check
+    with _client_lock:
+        _client = _client_models = None
+        _next_check = time.monotonic() + RETRY_SECONDS if retry_later else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the FileZen models loaded and serve them locally.")
+    parser.add_argument("--models-dir", help="Folder holding the models")
+    parser.add_argument("--image-backend", choices=list(IMAGE_BACKENDS), help="Image model format")
+    parser.add_argument("--batch-size", type=int, default=None, help="Images per image model call")
+    parser.add_argument("--ocr", action="store_true", help="Also load the EasyOCR reader")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.models_dir or args.image_backend:
+        from model_registry import configure
+        configure(models_dir=args.models_dir, image_backend=args.image_backend)
+    # Exit through serve()'s cleanup, which removes the socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    serve(default_socket_path(), args.batch_size, args.ocr)
+
+if __name__ == "__main__":
+    main()
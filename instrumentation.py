@@ -0,0 +1,154 @@
+import csv
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Stages timed during an organize run
+STAGES = ("scan", "decode", "extract", "ocr", "embed", "predict", "file_op")
+
+class RunStats:
+    """
+    Timings and counters for one organize run.
+    Recording a timing or a counter is a lock-protected dict update, cheap
+    enough to leave on for every file. Stage times are summed wall time over
+    all workers, so concurrent stages can add up to more than the run's
+    elapsed time.
+    Args:
+        live_callback (callable, optional): live_callback(snapshot) is called
+            with the current snapshot at most every live_interval seconds
+        live_interval (float): Minimum seconds between live callbacks
+    """
+
+    def __init__(self, live_callback=None, live_interval=1.0):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.stage_calls = Counter()
+        self.stage_items = Counter()
+        self.stage_seconds = defaultdict(float)
+        self.counters = defaultdict(Counter)
+        self.bytes_moved = 0
+        self.live_callback = live_callback
+        self.live_interval = live_interval
+        self._last_live = 0.0
+
+    def add_time(self, stage, seconds, items=1):
+        """Record `seconds` spent in a stage on `items` files."""
+        with self._lock:
+            self.stage_calls[stage] += 1
+            self.stage_items[stage] += items
+            self.stage_seconds[stage] += seconds
+
+    @contextmanager
+    def timed(self, stage, items=1):
+        """Time the body of a with-block as one call of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, items)
+
+    def count(self, group, key, n=1):
+        """Increment a counter, e.g. count("categories", "images/Nature")."""
+        with self._lock:
+            self.counters[group][key] += n
+
+    def record_error(self, stage, error):
+        self.count("errors", f"{stage}:{type(error).__name__}")
+
+    def add_bytes(self, num_bytes):
+        with self._lock:
+            self.bytes_moved += num_bytes
+
+    def cache_result(self, cache_name, hit, n=1):
+        self.count("cache", f"{cache_name}_{'hits' if hit else 'misses'}", n)
+
+    def notify(self):
+        """Call the live callback if enough time has passed since the last call."""
+        if self.live_callback is None:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            if now - self._last_live < self.live_interval:
+                return
+            self._last_live = now
+        self.live_callback(self.snapshot())
+
+    def snapshot(self):
+        """Return the current statistics as a JSON-serializable dict."""
+        with self._lock:
+            elapsed = time.perf_counter() - self._start
+            stages = {
+                stage: {
+                    "calls": self.stage_calls[stage],
+                    "files": self.stage_items[stage],
+                    "seconds": self.stage_seconds[stage],
+                    "ms_per_file": (self.stage_seconds[stage] / self.stage_items[stage] * 1000
+                                    if self.stage_items[stage] else None),
+                }
+                for stage in sorted(self.stage_seconds, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES))
+            }
+            counters = {group: dict(values) for group, values in self.counters.items()}
+            bytes_moved = self.bytes_moved
+
+        cache = counters.get("cache", {})
+        hit_rates = {}
+        for key in cache:
+            if key.endswith("_hits"):
+                name = key[:-len("_hits")]
+                total = cache[key] + cache.get(f"{name}_misses", 0)
+                hit_rates[name] = cache[key] / total if total else None
+        return {
+            "elapsed_seconds": elapsed,
+            "stages": stages,
+            "counters": counters,
+            "cache_hit_rates": hit_rates,
+            "bytes_moved": bytes_moved,
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as json_file:
+            json.dump(self.snapshot(), json_file, indent=2)
+
+    def write_csv(self, path):
+        """Write the report as rows of (section, key, value, seconds)."""
+        snapshot = self.snapshot()
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["section", "key", "value", "seconds"])
+            writer.writerow(["run", "elapsed", "", f"{snapshot['elapsed_seconds']:.6f}"])
+            writer.writerow(["run", "bytes_moved", snapshot["bytes_moved"], ""])
+            for stage, values in snapshot["stages"].items():
+                writer.writerow(["stage", stage, values["files"], f"{values['seconds']:.6f}"])
+            for group, values in snapshot["counters"].items():
+                for key, value in sorted(values.items()):
+                    writer.writerow([group, key, value, ""])
+            for name, rate in snapshot["cache_hit_rates"].items():
+                writer.writerow(["cache_hit_rate", name, "" if rate is None else f"{rate:.4f}", ""])
+
+    def write_report(self, path):
+        """Write the report as CSV if path ends in .csv, JSON otherwise."""
+        if path.lower().endswith(".csv"):
+            self.write_csv(path)
+        else:
+            self.write_json(path)
+
+def timed_iter(stats, stage, iterable):
+    """Yield from iterable, recording the time spent producing each item under `stage`."""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats.add_time(stage, time.perf_counter() - start, 0)
+            return
+        stats.add_time(stage, time.perf_counter() - start)
+        yield item
+
+def timed_call(func, *args):
+    """Call func(*args) and return (result, seconds). Picklable for process pools."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Models directory used when none is configured: $FILEZEN_MODELS_DIR, or the
+# models folder next to this file.
+DEFAULT_MODELS_DIR = os.environ.get(
+    "FILEZEN_MODELS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"),
+)
+
+IMAGE_MODEL_FILE = "image_classifier_model.h5"
+CLASS_LABELS_FILE = "class_labels.json"
+EMBEDDING_MODEL_NAME = 'paraphrase-MiniLM-L6-v2'   # --------embedding model---------
+
+# Image classifier backends and the model file each one runs.
+# The TFLite files are written by export_tflite.py.
+IMAGE_BACKENDS = {
+    "keras": IMAGE_MODEL_FILE,
+    "tflite-float16": "image_classifier_model_float16.tflite",
+    "tflite-int8": "image_classifier_model_int8.tflite",
+}
+DEFAULT_IMAGE_BACKEND = os.environ.get("FILEZEN_IMAGE_BACKEND", "keras")
+
+class TFLiteClassifier:
+    """
+    Runs a TFLite image classifier behind the same predict/predict_on_batch
+    interface as the Keras model. Uses tflite_runtime when installed, so
+    TensorFlow itself is not needed.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self._interpreter = Interpreter(model_path=model_path, num_threads=num_threads or os.cpu_count())
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = self._input["shape"][0]
+        # One interpreter is not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+    def predict_on_batch(self, batch):
+        import numpy as np
+
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self._interpreter.allocate_tensors()
+                self._input = self._interpreter.get_input_details()[0]
+                self._output = self._interpreter.get_output_details()[0]
+                self._batch_size = batch.shape[0]
+
+            # Fully integer models take quantized input
+            if self._input["dtype"] != np.float32:
+                scale, zero_point = self._input["quantization"]
+                info = np.iinfo(self._input["dtype"])
+                batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max)
+                batch = batch.astype(self._input["dtype"])
+
+            self._interpreter.set_tensor(self._input["index"], batch)
+            self._interpreter.invoke()
+            output = self._interpreter.get_tensor(self._output["index"])
+
+        if self._output["dtype"] != np.float32:
+            scale, zero_point = self._output["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return np.array(output, dtype=np.float32)
+
+    def predict(self, batch, **kwargs):
+        return self.predict_on_batch(batch)
+
+class ModelRegistry:
+    """
+    Loads models on first use and keeps them for the rest of the process.
+    Nothing heavy (tensorflow, sentence_transformers) is imported until a model
+    that needs it is requested, so creating a registry is cheap.
+    """
+
+    def __init__(self, models_dir=None, image_backend=None, tflite_threads=None):
+        self.models_dir = models_dir or DEFAULT_MODELS_DIR
+        self.image_backend = image_backend or DEFAULT_IMAGE_BACKEND
+        if self.image_backend not in IMAGE_BACKENDS:
+            raise ValueError(f"Unknown image backend '{self.image_backend}', expected one of {list(IMAGE_BACKENDS)}")
+        self.tflite_threads = tflite_threads
+        self._lock = threading.RLock()
+        self._models = {}
+        self._loaders = {}
+        self.register("image_model", self._load_image_model)
+        self.register("class_labels", self._load_class_labels)
+        self.register("embedding_model", self._load_embedding_model)
+
+    def path(self, *parts):
+        """Return a path inside the models directory."""
+        return os.path.join(self.models_dir, *parts)
+
+    def register(self, name, loader):
+        """Register a loader, called with no arguments the first time `name` is requested."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._models.pop(name, None)
+
+    def get(self, name):
+        """Return the model registered as `name`, loading it if needed."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            if name not in self._models:
+                if name not in self._loaders:
+                    raise KeyError(f"No model registered as '{name}'")
+                self._models[name] = self._loaders[name]()
+            return self._models[name]
+
+    def image_model_path(self):
+        """Path of the model file run by the selected image backend."""
+        return self.path(IMAGE_BACKENDS[self.image_backend])
+
+    def set_image_backend(self, backend, tflite_threads=None):
+        """Switch the image classifier backend; the new model loads on next use."""
+        if backend not in IMAGE_BACKENDS:
+            raise ValueError(f"Unknown image backend '{backend}', expected one of {list(IMAGE_BACKENDS)}")
+        with self._lock:
+            self.image_backend = backend
+            self.tflite_threads = tflite_threads
+            self._models.pop("image_model", None)
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def unload(self, name):
+        """Drop a loaded model so the next request reloads it."""
+        with self._lock:
+            self._models.pop(name, None)
+
+    def _load_image_model(self):
+        model_path = self.image_model_path()
+        logger.info("Loading image model (%s) from: %s", self.image_backend, model_path)
+        if self.image_backend != "keras":
+            return TFLiteClassifier(model_path, num_threads=self.tflite_threads)
+
+        import tensorflow as tf
+        return tf.keras.models.load_model(model_path)
+
+    def _load_class_labels(self):
+        with open(self.path(CLASS_LABELS_FILE), "r") as json_file:
+            return json.load(json_file)
+
+    def _load_embedding_model(self):
+        """
+        First tries to load the embedding model from the local models directory,
+        then downloads it if not found.
+        """
+        from sentence_transformers import SentenceTransformer
+
+        model_name = EMBEDDING_MODEL_NAME
+        local_model_path = self.path(model_name)
+
+        # Try loading from local path first
+        try:
+            if os.path.exists(local_model_path):
+                logger.info("Loading embedding model from local path: %s", local_model_path)
+                return SentenceTransformer(local_model_path)
+
+            # Download and save the model
+            logger.info("Downloading embedding model '%s' (this may take a while)...", model_name)
+            embedding_model = SentenceTransformer(model_name)
+
+            # Save the model for future use
+            os.makedirs(local_model_path, exist_ok=True)
+            embedding_model.save(local_model_path)
+            logger.info("Model saved to: %s", local_model_path)
+            return embedding_model
+        except Exception as e:
+            logger.error("Error loading embedding model: %s", e)
+            # Fallback to direct loading
+            return SentenceTransformer(model_name)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """Return the process-wide model registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+def configure(models_dir=None, image_backend=None, tflite_threads=None):
+    """Replace the process-wide registry, e.g. to use another models directory or image backend."""
+    global _registry
+    with _registry_lock:
+        _registry = ModelRegistry(models_dir, image_backend, tflite_threads)
+    return _registry
@@ -0,0 +1,143 @@
+"""
+Batched OCR for images that hold text.
+
+Images are decoded straight to grayscale at OCR_MAX_SIDE pixels on their long
+side (JPEGs at a reduced DCT scale), padded to a few canvas sizes so images of
+similar shape share one EasyOCR detector batch, and the text is cut to what
+classify_text reads.
+"""
+import importlib.metadata
+import importlib.util
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from inference import run_on_daemon, MAX_TEXT_CHARS
+
+logger = logging.getLogger(__name__)
+
+# easyocr imports torch, so it is only imported once OCR is actually needed
+HAS_OCR = importlib.util.find_spec("easyocr") is not None
+if not HAS_OCR:
+    logger.debug("EasyOCR not found. To enable OCR features, install it with: pip install easyocr")
+
+# Image classes whose pictures usually carry text worth reading
+OCR_CLASSES = ("Documents", "Notes", "Screenshots", "Slips", "Study_Materials", "Text")
+LANGUAGES = ["en"]
+# Long side, in pixels, images are reduced to; small print stays legible
+OCR_MAX_SIDE = 1536
+# Canvas sides are rounded up to this step so differently sized images batch together
+CANVAS_STEP = 128
+# Images per detector batch
+OCR_BATCH_SIZE = 8
+# Threads decoding images for a batch
+LOAD_WORKERS = 4
+# Shorter OCR results are noise rather than text to classify
+OCR_MIN_CHARS = 20
+
+# Identifies OCR output in the result cache; changes with the reader or the resolution
+def _easyocr_version():
+    try:
+        return importlib.metadata.version("easyocr")
+    except importlib.metadata.PackageNotFoundError:
+        return "none"
+
+OCR_VERSION = f"easyocr-{_easyocr_version()}-{'+'.join(LANGUAGES)}-{OCR_MAX_SIDE}"
+
+_reader = None
+
+def needs_ocr(label):
+    """Whether an image classified as label should be read with OCR."""
+    return HAS_OCR and str(label).lower() in {name.lower() for name in OCR_CLASSES}
+
+def get_ocr_reader():
+    global _reader
+    if _reader is None:
+        import easyocr
+
+        logger.info("Loading EasyOCR model (first time only)...")
+        _reader = easyocr.Reader(LANGUAGES)
+    return _reader
+
+def load_ocr_image(image_path, max_side=OCR_MAX_SIDE):
+    """
+    Load an image as a grayscale uint8 array, upright and at most max_side
+    pixels on its long side, padded with white to a multiple of CANVAS_STEP.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(image_path) as img:
+        scale = min(1.0, max_side / max(img.size))
+        size = (max(1, math.ceil(img.size[0] * scale)), max(1, math.ceil(img.size[1] * scale)))
+        if img.format == "JPEG":
+            img.draft("L", size)
+        img = ImageOps.exif_transpose(img).convert("L")
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.BILINEAR)
+    canvas = np.full((math.ceil(img.size[1] / CANVAS_STEP) * CANVAS_STEP,
+                      math.ceil(img.size[0] / CANVAS_STEP) * CANVAS_STEP), 255, dtype=np.uint8)
+    canvas[:img.size[1], :img.size[0]] = np.asarray(img)
+    return canvas
+
+def _read_batch(reader, images):
+    if hasattr(reader, "readtext_batched"):
+        return reader.readtext_batched(images, batch_size=len(images), detail=0)
+    return [reader.readtext(image, detail=0) for image in images]
+
+def _safe_load(image_path):
+    try:
+        return load_ocr_image(image_path)
+    except Exception as e:
+        logger.error("OCR Error: cannot load %s: %s", image_path, e)
+        return None
+
+def recognize_local(image_paths, batch_size=OCR_BATCH_SIZE):
+    """
+    Run OCR in this process. Returns one text per path: "" for an image
+    without text, None where OCR failed (or EasyOCR is not installed).
+    """
+    texts = [None] * len(image_paths)
+    if not HAS_OCR:
+        return texts
+    reader = get_ocr_reader()
+    with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(image_paths)) or 1) as executor:
+        images = list(executor.map(_safe_load, image_paths))
+    by_shape = {}
+    for i, image in enumerate(images):
+        if image is not None:
+            by_shape.setdefault(image.shape, []).append((i, image))
+
+    for group in by_shape.values():
+        for start in range(0, len(group), batch_size):
+            chunk = group[start:start + batch_size]
+            try:
+                results = _read_batch(reader, [image for _, image in chunk])
+            except Exception as e:
+                logger.error("OCR Error: %s", e)
+                continue
+            for (i, _), words in zip(chunk, results):
+                texts[i] = " ".join(words)[:MAX_TEXT_CHARS]
+    return texts
+
+def recognize(image_paths, batch_size=OCR_BATCH_SIZE):
+    """
+    Read the text in images, on the inference daemon when one is running.
+    Returns one text per path, None where OCR failed.
+    """
+    if not image_paths:
+        return []
+    texts = run_on_daemon("ocr", list(image_paths))
+    if texts is None:
+        return recognize_local(image_paths, batch_size)
+    # Images the daemon could not read (e.g. it has no EasyOCR) are tried here
+    failed = [i for i, text in enumerate(texts) if text is None]
+    if failed and HAS_OCR:
+        for i, text in zip(failed, recognize_local([image_paths[i] for i in failed], batch_size)):
+            texts[i] = text
+    return texts
+
+def perform_ocr(image_path):
+    """Read the text in one image; "" if OCR failed."""
+    return recognize([image_path])[0] or ""
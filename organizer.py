@@ -0,0 +1,373 @@
+import logging
+import os
+import threading
+import time
+
+from instrumentation import RunStats, timed_iter
+from inference import (
+    image_model_version, category_set_key, get_registry, EMBEDDING_MODEL_NAME,
+)
+from dedup import find_duplicates, DEDUP_POLICIES
+from pipeline import run_pipeline, FileJob, IMAGE, DOCUMENT, OCR
+from ocr import HAS_OCR, OCR_VERSION, OCR_MIN_CHARS, needs_ocr, recognize
+from placement import Placer
+from category_index import CategoryIndex, CATEGORY_INDEX_DIR
+from result_cache import ResultCache, RESULT_CACHE_FILE
+from scanner import DirectoryScanner, prefetch
+
+logger = logging.getLogger(__name__)
+
+# Folders created by FileZen; never rescanned when they sit inside the source
+ORGANIZED_FOLDERS = ["images", "documents", "videos", "audios", "software", "archives", "others", "datasheets"]
+
+# Categories for text-based files
+TEXT_CATEGORIES = {
+    "books": "Educational materials, textbooks, novels, fiction, non-fiction literature",
+    "documents": "Official papers, reports, certificates, formal documentation",
+    "stories": "Narratives, creative writing, short stories, personal accounts",
+    "assignments": "School or university homework, projects, academic tasks",
+    "magazines": "Periodicals, articles, news publications, journals",
+    "financials": "Financial statements, invoices, receipts, banking documents",
+    "technical": "Technical documentation, manuals, specifications, guides",
+    "personal": "Personal letters, notes, diaries, messages",
+    "academic": "Research papers, scholarly articles, academic publications"
+}
+
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.webp']
+DOCUMENT_EXTENSIONS = ['.pdf', '.docx', '.txt', '.md']
+
+def content_category(ext):
+    """Category of a file that is not classified by a model in Content mode."""
+    if ext in ['.csv', '.xlsx']:
+        return "datasheets"
+    elif ext in ['.mp4', '.mkv', '.webm']:
+        return "videos"
+    elif ext in ['.mp3', '.wav']:
+        return "audios"
+    elif ext in ['.zip', '.rar', '.7z']:
+        return "archives"
+    else:
+        return "others"
+
+def extension_category(ext):
+    """Category of a file when organizing by extension."""
+    if ext in IMAGE_EXTENSIONS:
+        return "images"
+    elif ext in ['.pdf', '.docx', '.ppt', '.txt']:
+        return "documents"
+    elif ext in ['.csv', '.xlsx']:
+        return "datasheets"
+    elif ext in ['.mp4', '.mkv', '.webm']:
+        return "videos"
+    elif ext in ['.mp3', '.wav']:
+        return "audios"
+    elif ext in ['.exe', '.apk', '.msi']:
+        return "software"
+    elif ext in ['.zip', '.rar', '.7z']:
+        return "archives"
+    else:
+        return "others"
+
+def default_text_categories():
+    """The category index in the models folder if it holds any categories, else TEXT_CATEGORIES."""
+    index_dir = get_registry().path(CATEGORY_INDEX_DIR)
+    if os.path.isdir(index_dir):
+        try:
+            index = CategoryIndex(index_dir)
+            if index.categories():
+                return index
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring category index %s: %s", index_dir, e)
+    return TEXT_CATEGORIES
+
+def open_result_cache(use_ocr=True):
+    """Open the result cache and drop entries of other image model and OCR versions."""
+    cache = ResultCache(get_registry().path(RESULT_CACHE_FILE))
+    cache.prune("image", image_model_version())
+    if use_ocr and HAS_OCR:
+        cache.prune("ocr", OCR_VERSION)
+    return cache
+
+def organize_files(source_path, destination_path, mode, organize_by, should_copy=True,
+                   recursive=False, include=None, exclude=None, text_categories=None,
+                   pipeline_config=None, progress_callback=None, use_result_cache=True,
+                   stats=None, stats_callback=None, report_path=None, paths=None, dedup=None,
+                   use_ocr=True, result_cache=None, placer=None):
+    """
+    Classify the files under source_path and copy or move them into destination_path.
+    Args:
+        source_path (str): Folder to organize
+        destination_path (str): Folder receiving the organized files
+        mode (str): "Separate by Folders", or "Include Class in File Name" to rename in place
+        organize_by (str): "Content" to classify with the models, "Extension" otherwise
+        should_copy (bool): Copy files instead of moving them
+        recursive (bool): Include subfolders of source_path
+        include, exclude (list, optional): Glob patterns passed to the scanner
+        text_categories (dict or CategoryIndex, optional): Categories for documents.
+            Defaults to default_text_categories().
+        pipeline_config (PipelineConfig, optional): Worker counts and batch sizes
+        progress_callback (callable, optional): progress_callback(done, total, scan_finished),
+            called from worker threads after every file; `total` grows while the scan runs
+        use_result_cache (bool): Reuse and record classification results in the result cache
+        stats (RunStats, optional): Collects stage timings and counters; a new one is
+            created if not given
+        stats_callback (callable, optional): stats_callback(snapshot) is called with live
+            statistics about once a second
+        report_path (str, optional): Write the run report here, as CSV if the name ends
+            in .csv and JSON otherwise
+        paths (list, optional): Organize only these files from source_path instead of
+            scanning it, as watch mode does
+        dedup (str, optional): One of DEDUP_POLICIES. Identical files are then classified
+            once, and the policy decides how the other copies are placed. The whole
+            source is scanned before processing starts.
+        use_ocr (bool): Read the text in images of the OCR_CLASSES with EasyOCR, when
+            installed, and file them by the category of that text
+        result_cache (ResultCache, optional): Open cache to use, as watch mode does
+            for all its batches; it is flushed but neither pruned nor closed.
+            By default a cache is opened with open_result_cache() and closed at the end.
+        placer (Placer, optional): Placer for destination_path and should_copy to reuse,
+            as watch mode does for all its batches
+    Returns:
+        dict: Counts of processed, copied, moved, linked, existing, duplicate and failed
+            files, the elapsed seconds and the run statistics under "stats"
+    """
+    if dedup is not None and dedup not in DEDUP_POLICIES:
+        raise ValueError(f"Unknown dedup policy '{dedup}', expected one of {list(DEDUP_POLICIES)}")
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Source path does not exist: {source_path}")
+    start_time = time.perf_counter()
+
+    if not os.path.exists(destination_path):
+        os.makedirs(destination_path)
+    # Creates each target folder once and finishes moves an earlier run left incomplete
+    if placer is None:
+        placer = Placer(destination_path, should_copy)
+
+    # Files are streamed from the scanner, so processing starts right away and
+    # the total is refined while the scan runs ahead
+    scanner = DirectoryScanner(
+        source_path, recursive=recursive, include=include, exclude=exclude,
+        skip_dirs=[os.path.join(destination_path, folder) for folder in ORGANIZED_FOLDERS],
+    )
+    listing = scanner
+    real_source, real_destination = os.path.realpath(source_path), os.path.realpath(destination_path)
+    if os.path.commonpath([real_source, real_destination]) == real_source:
+        # The scan streams while files are placed, so it would find this run's own output
+        listing = (entry for entry in scanner if not placer.owns(entry.path))
+    summary = {"processed": 0, "copied": 0, "moved": 0, "linked": 0, "existing": 0,
+               "duplicates": 0, "errors": 0}
+    progress_lock = threading.Lock()
+    if stats is None:
+        stats = RunStats(live_callback=stats_callback)
+    elif stats_callback is not None:
+        stats.live_callback = stats_callback
+
+    # Deduplication needs every file's size, so the scan completes first
+    if paths is not None:
+        paths = list(paths)
+    elif dedup is not None:
+        paths = list(timed_iter(stats, "scan", listing))
+    # Other copies of a file, keyed on the path of the copy that is classified
+    duplicates = {}
+    if dedup is not None:
+        with stats.timed("dedup", len(paths)):
+            groups = find_duplicates(paths, workers=pipeline_config.io_workers if pipeline_config else 4)
+        for group in groups:
+            duplicates[os.fspath(group[0])] = group[1:]
+        if dedup == "report":
+            summary["duplicate_groups"] = [[os.fspath(item) for item in group] for group in groups]
+        logger.info("Found %d groups of identical files", len(groups))
+
+    # Categories for text-based files
+    if text_categories is None:
+        text_categories = default_text_categories()
+
+    # Results from earlier runs are reused from the result cache; only files
+    # that are new or changed go through the models.
+    cache = None
+    if organize_by == "Content":
+        image_version = image_model_version()
+        category_hash = category_set_key(text_categories)
+        if use_result_cache:
+            cache = result_cache or open_result_cache(use_ocr)
+            # A shared cache counts across runs; only this run's share is reported
+            hits_before, misses_before = cache.hits, cache.misses
+    use_ocr = use_ocr and HAS_OCR and organize_by == "Content"
+
+    def lookup_cached(job, kind, model_version, category_hash=""):
+        if cache is None:
+            return None
+        try:
+            return cache.lookup(job.path, kind, model_version, category_hash, job.stat())
+        except OSError as e:
+            logger.warning("Result cache lookup failed for %s: %s", job.path, e)
+            stats.record_error("cache", e)
+            return None
+
+    def route(job):
+        """Decide which files need a model; the rest get their category now."""
+        if organize_by != "Content":
+            job.category = extension_category(job.ext)
+        elif job.ext in IMAGE_EXTENSIONS:
+            cached = lookup_cached(job, "image", image_version)
+            if cached is None:
+                job.kind = IMAGE
+            else:
+                job.label, job.score = cached
+                if use_ocr and needs_ocr(job.label):
+                    job.kind = OCR
+                else:
+                    finish(job)
+        elif job.ext in DOCUMENT_EXTENSIONS:
+            cached = lookup_cached(job, "text", EMBEDDING_MODEL_NAME, category_hash)
+            if cached is None:
+                job.kind = DOCUMENT
+            else:
+                job.label, job.score = cached
+                finish(job)
+        else:
+            job.category = content_category(job.ext)
+
+    def finish(job):
+        """Turn a model label into a category."""
+        if job.ext in IMAGE_EXTENSIONS:
+            job.category = f"images/{job.text_label or job.label}"
+        else:
+            job.category = f"documents/{job.label}"
+
+    def remember(job):
+        """
+        Cache a fresh model result. Runs on an I/O worker before the file is
+        placed, so hashing it holds up neither discovery nor the models.
+        """
+        if cache is None or job.error is not None or job.kind not in (IMAGE, DOCUMENT):
+            return
+        try:
+            if job.kind == IMAGE:
+                cache.store(job.path, "image", image_version, job.label, job.score)
+            else:
+                cache.store(job.path, "text", EMBEDDING_MODEL_NAME, job.label, job.score, category_hash)
+        except OSError as e:
+            logger.warning("Result cache store failed for %s: %s", job.path, e)
+            stats.record_error("cache", e)
+
+    def read_texts(jobs):
+        """OCR text of images, from the result cache where possible."""
+        texts = [None] * len(jobs)
+        for i, job in enumerate(jobs):
+            cached = lookup_cached(job, "ocr", OCR_VERSION)
+            if cached is not None:
+                texts[i] = cached[0]
+        missing = [i for i, text in enumerate(texts) if text is None]
+        found = recognize([jobs[i].path for i in missing]) if missing else []
+        for i, text in zip(missing, found):
+            texts[i] = text
+            if text is None:
+                # Not cached, so the image is read again on the next run
+                jobs[i].error = OSError(f"OCR failed for {jobs[i].path}")
+                stats.record_error("ocr", jobs[i].error)
+            elif cache is not None:
+                try:
+                    cache.store(jobs[i].path, "ocr", OCR_VERSION, text, 0.0)
+                except OSError as e:
+                    logger.warning("Result cache store failed for %s: %s", jobs[i].path, e)
+                    stats.record_error("cache", e)
+        logger.debug("Read text in %d images, %d from the cache", len(jobs), len(jobs) - len(missing))
+        return [text if text and len(text.strip()) >= OCR_MIN_CHARS else "" for text in texts]
+
+    def place(job, link_to=None):
+        remember(job)
+        # Create target path based on mode
+        if mode == "Separate by Folders":
+            target_path = os.path.join(destination_path, job.category, job.name)
+        else:
+            # Keep in the same location but rename with category prefix
+            category_name = job.category.split('/')[-1] if '/' in job.category else job.category
+            name, extension = os.path.splitext(job.name)
+            target_path = os.path.join(destination_path, f"{name}_({category_name}){extension}")
+        job.target_path = target_path
+
+        with stats.timed("file_op"):
+            source_stat = job.stat()
+            job.status = placer.place(job.path, target_path, link_to)
+        logger.debug("%s: %s to %s", job.status.capitalize(), job.name, target_path)
+        if job.status in ("copied", "moved"):
+            stats.add_bytes(source_stat.st_size)
+
+    def place_duplicates(job):
+        """Apply the dedup policy to the other copies of a classified file."""
+        for item in duplicates.get(job.path, ()):
+            duplicate = FileJob(item)
+            duplicate.label, duplicate.score, duplicate.category = job.label, job.score, job.category
+            if dedup == "skip" or duplicate.category is None:
+                duplicate.status = "duplicates"
+            else:
+                # Link to the first copy's file when it was copied into place
+                link_to = None
+                if dedup == "hardlink" and should_copy and job.status in ("copied", "linked"):
+                    link_to = job.target_path
+                try:
+                    place(duplicate, link_to)
+                except Exception as e:
+                    logger.error("Error handling %s: %s", duplicate.path, e)
+                    stats.record_error("file_op", e)
+                    duplicate.error = e
+                stats.count("files", "duplicates")
+                with progress_lock:
+                    summary["duplicates"] += 1
+            record(duplicate)
+
+    def on_done(job):
+        record(job)
+        if duplicates:
+            place_duplicates(job)
+
+    def record(job):
+        with progress_lock:
+            summary["processed"] += 1
+            if job.status in summary:
+                summary[job.status] += 1
+            if job.error is not None:
+                summary["errors"] += 1
+            done = summary["processed"]
+        stats.count("categories", job.category or "none")
+        if job.status is not None:
+            stats.count("files", job.status)
+        stats.notify()
+        if progress_callback is not None:
+            # Progress is reported against the files found so far
+            if paths is not None:
+                progress_callback(done, len(paths), True)
+            else:
+                progress_callback(done, max(scanner.found, done), scanner.done)
+
+    # Extraction, inference and copying run concurrently in separate stages
+    try:
+        if paths is None:
+            files = prefetch(timed_iter(stats, "scan", listing))
+        elif duplicates:
+            skipped = {os.fspath(item) for group in duplicates.values() for item in group}
+            files = [item for item in paths if os.fspath(item) not in skipped]
+        else:
+            files = paths
+        run_pipeline(files, route, finish, place,
+                     on_done=on_done, text_categories=text_categories, config=pipeline_config,
+                     stats=stats, needs_ocr=lambda job: needs_ocr(job.label),
+                     ocr=read_texts if use_ocr else None)
+    finally:
+        placer.close()
+        if cache is not None:
+            hits, misses = cache.hits - hits_before, cache.misses - misses_before
+            logger.info("Result cache: %d hits, %d misses", hits, misses)
+            stats.cache_result("result_cache", True, hits)
+            stats.cache_result("result_cache", False, misses)
+            if result_cache is None:
+                cache.close()
+            else:
+                cache.flush()
+
+    summary["seconds"] = time.perf_counter() - start_time
+    summary["stats"] = stats.snapshot()
+    if report_path:
+        stats.write_report(report_path)
+    return summary
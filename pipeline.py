@@ -0,0 +1,371 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+from inference import (
+    load_image_array, extract_text_from_file, predict_image_batch, classify_texts,
+    DEFAULT_BATCH_SIZE,
+)
+from instrumentation import timed_call
+
+logger = logging.getLogger(__name__)
+
+# Kinds of files that go through a model; files routed with no kind skip
+# straight to placement.
+IMAGE = "image"
+DOCUMENT = "document"
+# An image whose label is already known and only needs OCR
+OCR = "ocr"
+
+# Marks the end of a queue
+_DONE = object()
+
+# Extraction failures become job errors, so a missing parser is not cached as an empty text
+_extract_text = partial(extract_text_from_file, raise_errors=True)
+
+class FileJob:
+    """One file travelling through the pipeline."""
+
+    __slots__ = ("path", "entry", "name", "ext", "kind", "data", "label", "score",
+                 "text_label", "category", "target_path", "status", "error")
+
+    def __init__(self, path):
+        # Scanners yield os.DirEntry objects; keep them for their cached stat data
+        self.entry = path if isinstance(path, os.DirEntry) else None
+        path = os.fspath(path)
+        self.path = path
+        self.name = os.path.basename(path)
+        self.ext = os.path.splitext(self.name)[1].lower()
+        self.kind = None          # IMAGE, DOCUMENT, OCR or None
+        self.data = None          # decoded image array or extracted text
+        self.label = None         # model output
+        self.score = 0.0
+        self.text_label = None    # category of the text OCR found in an image
+        self.category = None      # folder the file is organized into
+        self.target_path = None
+        self.status = None        # result of placement, set by the place callback
+        self.error = None
+
+    def stat(self):
+        """Stat the file, reusing the scanner's DirEntry data when available."""
+        if self.entry is not None:
+            return self.entry.stat()
+        return os.stat(self.path)
+
+class PipelineConfig:
+    """Worker counts and queue sizes for each pipeline stage."""
+
+    def __init__(self, prepare_workers=None, extract_processes=0, io_workers=4,
+                 batch_size=DEFAULT_BATCH_SIZE, text_batch_size=64, ocr_batch_size=8,
+                 max_in_flight=256, flush_interval=0.05):
+        # Threads decoding images and extracting text
+        self.prepare_workers = prepare_workers or os.cpu_count() or 1
+        # Processes for text extraction (PDF/docx parsing holds the GIL); 0 uses the threads
+        self.extract_processes = extract_processes
+        # Threads copying/moving files
+        self.io_workers = max(1, io_workers)
+        self.batch_size = batch_size
+        self.text_batch_size = text_batch_size
+        self.ocr_batch_size = ocr_batch_size
+        # Files decoded or extracted but not yet placed; bounds memory use
+        self.max_in_flight = max(max_in_flight, 2 * max(batch_size, text_batch_size))
+        # Seconds the inference stage waits for more input before running a partial batch
+        self.flush_interval = flush_interval
+
+class Pipeline:
+    """
+    Organizes files in concurrent stages connected by bounded queues:
+
+        discovery -> prepare pool -> batching inference -> [OCR] -> I/O pool
+
+    The discovery thread routes each file; files that need a model are decoded
+    or extracted by the prepare pool, grouped into batches by the inference
+    thread, and every file ends at one of the I/O workers. Images that hold
+    text are read in batches by a separate OCR thread on their way, so OCR
+    never holds up the models.
+    Args:
+        route (callable): route(job) sets job.kind to IMAGE or DOCUMENT (or OCR,
+            when ocr is given), or sets job.category directly for files that need no model
+        finish (callable): finish(job) turns job.label into job.category
+        place (callable): place(job) copies or moves the file to its category
+        on_done (callable, optional): on_done(job) is called once per file,
+            from an I/O worker, after placement
+        text_categories (dict or CategoryIndex, optional): Categories passed to classify_texts
+        needs_ocr (callable, optional): needs_ocr(job) tells whether a classified
+            image goes through OCR
+        ocr (callable, optional): ocr(jobs) returns the text of each image; texts
+            are classified into job.text_label, empty ones are skipped
+        config (PipelineConfig, optional): Stage sizes
+        stats (RunStats, optional): Receives decode, extract, predict, ocr and
+            embed timings and per-stage error counts
+    """
+
+    def __init__(self, route, finish, place, on_done=None, text_categories=None, config=None,
+                 stats=None, needs_ocr=None, ocr=None):
+        self.route = route
+        self.finish = finish
+        self.place = place
+        self.on_done = on_done
+        self.text_categories = text_categories
+        self.config = config or PipelineConfig()
+        self.stats = stats
+        self.needs_ocr = needs_ocr if ocr is not None else None
+        self.ocr = ocr
+        self._infer_queue = queue.Queue()
+        self._ocr_queue = queue.Queue() if ocr is not None else None
+        self._place_queue = queue.Queue(maxsize=self.config.max_in_flight)
+        self._in_flight = threading.BoundedSemaphore(self.config.max_in_flight)
+        self._count_lock = threading.Lock()
+        self.processed = 0
+
+    def run(self, paths):
+        """Process every path (str or os.DirEntry) and return the number of files processed."""
+        threads = [
+            threading.Thread(target=self._discover, args=(paths,), name="filezen-discover"),
+            threading.Thread(target=self._infer, name="filezen-infer"),
+        ]
+        if self.ocr is not None:
+            threads.append(threading.Thread(target=self._ocr, name="filezen-ocr"))
+        threads += [
+            threading.Thread(target=self._place_worker, name=f"filezen-io-{i}")
+            for i in range(self.config.io_workers)
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.processed
+
+    def _discover(self, paths):
+        """Route files and hand the ones needing a model to the prepare pool."""
+        config = self.config
+        thread_pool = ThreadPoolExecutor(max_workers=config.prepare_workers)
+        process_pool = None
+        if config.extract_processes:
+            process_pool = ProcessPoolExecutor(max_workers=config.extract_processes)
+        try:
+            for path in paths:
+                job = FileJob(path)
+                try:
+                    self.route(job)
+                except Exception as e:
+                    logger.error("Error routing %s: %s", job.path, e)
+                    self._record_error("route", e)
+                    job.error = e
+                    job.kind = None
+
+                if job.kind is None:
+                    self._place_queue.put(job)
+                    continue
+
+                self._in_flight.acquire()
+                if job.kind == OCR:
+                    self._ocr_queue.put(job)
+                    continue
+                # timed_call is a module-level function, so it also runs in the process pool
+                if job.kind == IMAGE:
+                    future = thread_pool.submit(timed_call, load_image_array, job.path)
+                else:
+                    future = (process_pool or thread_pool).submit(timed_call, _extract_text, job.path)
+                future.add_done_callback(partial(self._prepared, job))
+        except Exception as e:
+            logger.error("Error listing files: %s", e)
+            self._record_error("scan", e)
+        finally:
+            thread_pool.shutdown(wait=True)
+            if process_pool is not None:
+                process_pool.shutdown(wait=True)
+            self._infer_queue.put(_DONE)
+
+    def _prepared(self, job, future):
+        stage = "decode" if job.kind == IMAGE else "extract"
+        try:
+            job.data, seconds = future.result()
+            if self.stats is not None:
+                self.stats.add_time(stage, seconds)
+        except Exception as e:
+            logger.error("Error reading %s: %s", job.path, e)
+            self._record_error(stage, e)
+            job.error = e
+        self._infer_queue.put(job)
+
+    def _record_error(self, stage, error):
+        if self.stats is not None:
+            self.stats.record_error(stage, error)
+
+    def _infer(self):
+        """Group prepared files into batches and run the models on them."""
+        config = self.config
+        images = []
+        documents = []
+        try:
+            done = False
+            while not done:
+                waiting = images or documents
+                try:
+                    job = self._infer_queue.get(timeout=config.flush_interval if waiting else None)
+                except queue.Empty:
+                    job = None   # input is idle: run whatever is batched so far
+
+                if job is _DONE:
+                    done = True
+                elif job is not None:
+                    if job.error is not None:
+                        job.label = "unknown"
+                        self._emit(job)
+                    elif job.kind == IMAGE:
+                        images.append(job)
+                    else:
+                        documents.append(job)
+
+                flush = job is None or done
+                if len(images) >= config.batch_size or (images and flush):
+                    self._run_images(images)
+                    images = []
+                if len(documents) >= config.text_batch_size or (documents and flush):
+                    self._run_documents(documents)
+                    documents = []
+        finally:
+            if self._ocr_queue is not None:
+                self._ocr_queue.put(_DONE)
+            else:
+                self._finish_placing()
+
+    def _finish_placing(self):
+        for _ in range(self.config.io_workers):
+            self._place_queue.put(_DONE)
+
+    def _run_images(self, jobs):
+        start = time.perf_counter()
+        try:
+            results = predict_image_batch(
+                [job.path for job in jobs], [job.data for job in jobs], self.config.batch_size
+            )
+        except Exception as e:
+            logger.error("Error classifying images: %s", e)
+            self._record_error("predict", e)
+            results = [(job.path, "unknown", 0.0) for job in jobs]
+            # Marked as failed, so the placeholder label is neither cached nor counted as a result
+            for job in jobs:
+                job.error = e
+        if self.stats is not None:
+            self.stats.add_time("predict", time.perf_counter() - start, len(jobs))
+        for job, (_, label, score) in zip(jobs, results):
+            job.data = None
+            job.label, job.score = label, score
+            if self.needs_ocr is not None and self.needs_ocr(job):
+                self._ocr_queue.put(job)
+            else:
+                self._emit(job)
+
+    def _run_documents(self, jobs):
+        start = time.perf_counter()
+        try:
+            labels, scores = classify_texts(
+                [job.data for job in jobs], self.text_categories, self.config.text_batch_size
+            )
+        except Exception as e:
+            logger.error("Error classifying documents: %s", e)
+            self._record_error("embed", e)
+            labels, scores = ["unknown"] * len(jobs), [0.0] * len(jobs)
+            for job in jobs:
+                job.error = e
+        if self.stats is not None:
+            self.stats.add_time("embed", time.perf_counter() - start, len(jobs))
+        for job, label, score in zip(jobs, labels, scores):
+            job.data = None
+            job.label, job.score = label, float(score)
+            self._emit(job)
+
+    def _ocr(self):
+        """Read the text in images in batches and classify it."""
+        config = self.config
+        jobs = []
+        try:
+            done = False
+            while not done:
+                try:
+                    job = self._ocr_queue.get(timeout=config.flush_interval if jobs else None)
+                except queue.Empty:
+                    job = None
+                if job is _DONE:
+                    done = True
+                elif job is not None:
+                    jobs.append(job)
+                if len(jobs) >= config.ocr_batch_size or (jobs and (job is None or done)):
+                    self._run_ocr(jobs)
+                    jobs = []
+        finally:
+            self._finish_placing()
+
+    def _run_ocr(self, jobs):
+        start = time.perf_counter()
+        try:
+            texts = self.ocr(jobs)
+        except Exception as e:
+            logger.error("Error reading text in images: %s", e)
+            self._record_error("ocr", e)
+            texts = [""] * len(jobs)
+            for job in jobs:
+                job.error = e
+        if self.stats is not None:
+            self.stats.add_time("ocr", time.perf_counter() - start, len(jobs))
+
+        found = [(job, text) for job, text in zip(jobs, texts) if text]
+        if found:
+            start = time.perf_counter()
+            try:
+                labels, _ = classify_texts([text for _, text in found], self.text_categories,
+                                           self.config.text_batch_size)
+                for (job, _), label in zip(found, labels):
+                    job.text_label = label
+            except Exception as e:
+                logger.error("Error classifying text in images: %s", e)
+                self._record_error("embed", e)
+                for job, _ in found:
+                    job.error = e
+            if self.stats is not None:
+                self.stats.add_time("embed", time.perf_counter() - start, len(found))
+        for job in jobs:
+            self._emit(job)
+
+    def _emit(self, job):
+        """Pass a classified file on to the I/O stage."""
+        try:
+            self.finish(job)
+        except Exception as e:
+            logger.error("Error categorizing %s: %s", job.path, e)
+            self._record_error("categorize", e)
+            job.error = e
+        self._place_queue.put(job)
+        self._in_flight.release()
+
+    def _place_worker(self):
+        while True:
+            job = self._place_queue.get()
+            if job is _DONE:
+                return
+            if job.category is not None:
+                try:
+                    self.place(job)
+                except Exception as e:
+                    logger.error("Error handling %s: %s", job.path, e)
+                    self._record_error("file_op", e)
+                    job.error = e
+            with self._count_lock:
+                self.processed += 1
+            if self.on_done is not None:
+                self.on_done(job)
+
+def run_pipeline(paths, route, finish, place, on_done=None, text_categories=None, config=None,
+                 stats=None, needs_ocr=None, ocr=None):
+    """Run a Pipeline over paths and return the number of files processed."""
+    pipeline = Pipeline(route, finish, place, on_done=on_done,
+                        text_categories=text_categories, config=config, stats=stats,
+                        needs_ocr=needs_ocr, ocr=ocr)
+    return pipeline.run(paths)
@@ -0,0 +1,250 @@
+import errno
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Journal of cross-device moves in progress, kept in the destination folder
+JOURNAL_FILE = ".filezen-journal"
+# Suffix of files being copied; renamed into place once complete
+PARTIAL_SUFFIX = ".filezen-part"
+
+# ioctl request that clones a file's extents (btrfs, XFS, bcachefs); Linux only
+FICLONE = 0x40049409
+
+def _reflink(fsrc, fdst):
+    """Share the source's data blocks with the destination; False if not supported."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import fcntl
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        return False
+
+def _kernel_copy(fsrc, fdst, size):
+    """Copy inside the kernel with copy_file_range, then sendfile, then read/write."""
+    in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+    offset = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                copied = os.copy_file_range(in_fd, out_fd, size - offset, offset, offset)
+                if copied == 0:
+                    break
+                offset += copied
+            return offset
+        except OSError:
+            pass
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        try:
+            os.lseek(out_fd, offset, os.SEEK_SET)
+            while offset < size:
+                sent = os.sendfile(out_fd, in_fd, offset, min(size - offset, 1 << 30))
+                if sent == 0:
+                    break
+                offset += sent
+            return offset
+        except OSError:
+            pass
+    fsrc.seek(offset)
+    fdst.seek(offset)
+    shutil.copyfileobj(fsrc, fdst, 1 << 20)
+    return fdst.tell()
+
+def copy_file(source, target_path):
+    """
+    Copy a file with its metadata, like shutil.copy2, cloning or copying in the
+    kernel where the filesystem allows. The copy is written under a temporary
+    name and renamed into place, so an interrupted copy never looks complete.
+    """
+    tmp_path = target_path + PARTIAL_SUFFIX
+    try:
+        with open(source, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+            if not _reflink(fsrc, fdst):
+                _kernel_copy(fsrc, fdst, os.fstat(fsrc.fileno()).st_size)
+        shutil.copystat(source, tmp_path)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+class Placer:
+    """
+    Copies, moves and links files into a destination folder.
+    Each target directory is created and listed once, and targets are claimed
+    in memory, so collisions with existing files or with other files of the
+    same run are found without a stat per file. A Placer can be reused after
+    close(), as watch mode does for its batches; folders listed in an earlier
+    run are then checked per target instead of listed again. Moves are a single rename;
+    only when that fails across filesystems is the file copied and the
+    source deleted. Those moves are
+    recorded in a journal in the destination, so a run interrupted half-way
+    through a move is completed by the next run.
+    Safe to use from several threads.
+    Args:
+        destination_path (str): Folder receiving the files
+        should_copy (bool): Copy files instead of moving them
+    """
+
+    def __init__(self, destination_path, should_copy=True):
+        self.destination_path = destination_path
+        self.should_copy = should_copy
+        self.journal_path = os.path.join(destination_path, JOURNAL_FILE)
+        self._lock = threading.Lock()
+        # Target directory -> names present or claimed
+        self._dirs = {}
+        # Target directories listed during the current run
+        self._listed = set()
+        # Targets claimed by this Placer, as normalized paths
+        self._claimed = set()
+        self._journal = None
+        # Cross-device moves started but not finished
+        self._open_moves = set()
+        self.recover()
+
+    def recover(self):
+        """Finish or roll back the cross-device moves an interrupted run left behind."""
+        if not os.path.exists(self.journal_path):
+            return
+        pending = {}
+        with open(self.journal_path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by the interruption
+                if "done" in entry:
+                    pending.pop(entry["done"], None)
+                else:
+                    pending[entry["target"]] = entry["source"]
+        for target_path, source in pending.items():
+            tmp_path = target_path + PARTIAL_SUFFIX
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            elif os.path.exists(target_path) and os.path.exists(source):
+                # The copy was complete (copy_file renames it into place with the
+                # source's mtime); only deleting the source was left
+                target_stat, source_stat = os.stat(target_path), os.stat(source)
+                if ((target_stat.st_size, target_stat.st_mtime_ns)
+                        == (source_stat.st_size, source_stat.st_mtime_ns)):
+                    os.unlink(source)
+                    logger.info("Completed interrupted move of %s", source)
+                else:
+                    logger.warning("Kept %s: it differs from %s", source, target_path)
+        os.unlink(self.journal_path)
+
+    def _claim(self, target_path):
+        """Reserve target_path; False if it is taken."""
+        target_dir, name = os.path.split(target_path)
+        key = os.path.normcase(name)
+        path_key = os.path.normcase(os.path.abspath(target_path))
+        with self._lock:
+            if path_key in self._claimed:
+                return False
+            names = self._dirs.get(target_dir)
+            if names is None:
+                os.makedirs(target_dir, exist_ok=True)
+                with os.scandir(target_dir) as entries:
+                    names = self._dirs[target_dir] = {os.path.normcase(e.name) for e in entries}
+                self._listed.add(target_dir)
+            elif target_dir not in self._listed:
+                # Listed in an earlier run; the folder may have changed since
+                os.makedirs(target_dir, exist_ok=True)
+                if os.path.lexists(target_path):
+                    names.add(key)
+                else:
+                    names.discard(key)
+            if key in names:
+                return False
+            names.add(key)
+            self._claimed.add(path_key)
+            return True
+
+    def _release(self, target_path):
+        target_dir, name = os.path.split(target_path)
+        with self._lock:
+            self._dirs[target_dir].discard(os.path.normcase(name))
+            self._claimed.discard(os.path.normcase(os.path.abspath(target_path)))
+
+    def owns(self, path):
+        """
+        Whether path is a file this Placer created or is creating: a claimed
+        target, a partial copy or the journal. Scans of a source that contains
+        the destination use it to skip files placed during the same run.
+        """
+        if path.endswith(PARTIAL_SUFFIX) or os.path.basename(path) == JOURNAL_FILE:
+            return True
+        with self._lock:
+            return os.path.normcase(os.path.abspath(path)) in self._claimed
+
+    def _log(self, entry):
+        with self._lock:
+            if "done" in entry:
+                self._open_moves.discard(entry["done"])
+            else:
+                self._open_moves.add(entry["target"])
+            if self._journal is None:
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self._journal.write(json.dumps(entry) + "\n")
+            self._journal.flush()
+
+    def place(self, source, target_path, link_to=None):
+        """
+        Put one file at target_path.
+        Args:
+            source (str): File to copy or move
+            target_path (str): Where it goes
+            link_to (str, optional): Hard-link target_path to this file instead, when possible
+        Returns:
+            str: "copied", "moved", "linked", or "existing" if target_path is taken
+        """
+        if not self._claim(target_path):
+            return "existing"
+        try:
+            if link_to is not None:
+                try:
+                    os.link(link_to, target_path)
+                    return "linked"
+                except OSError:
+                    pass
+            if self.should_copy:
+                copy_file(source, target_path)
+                return "copied"
+            # st_dev cannot tell (DirEntry.stat() reports 0 on Windows), so just try
+            try:
+                os.rename(source, target_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                self._log({"source": os.path.abspath(source), "target": os.path.abspath(target_path)})
+                copy_file(source, target_path)
+                os.unlink(source)
+                self._log({"done": os.path.abspath(target_path)})
+            return "moved"
+        except BaseException:
+            self._release(target_path)
+            raise
+
+    def close(self):
+        """
+        End a run: close the journal, which is removed if every move it records
+        has finished. Later runs check targets on disk, since files in the
+        destination may change between runs.
+        """
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+                if not self._open_moves:
+                    os.unlink(self.journal_path)
+            self._listed.clear()
+            self._claimed.clear()
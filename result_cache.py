@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+# Default file name of the cache database inside the models directory
+RESULT_CACHE_FILE = "result_cache.sqlite"
+
+# Pending writes are committed in groups of this size
+COMMIT_EVERY = 500
+
+def content_hash(file_path, chunk_size=1 << 20):
+    """Hash a file's contents in fixed-size chunks."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    On-disk cache of classification results.
+    Entries are keyed on the file (path, size, mtime, content hash), the kind of
+    classification ("image" or "text"), the model version and the category-set
+    hash. A file whose path, size and mtime are unchanged is answered with a
+    single stat; otherwise its content hash is used, so renamed or touched but
+    identical files are still hits. Files are only hashed on lookup when an
+    entry of the same size exists; store() hashes the rest, so callers can
+    leave that to a worker thread.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                path TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                category_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                label TEXT NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (path, kind, model_version, category_hash)
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_by_hash "
+            "ON results (content_hash, kind, model_version, category_hash)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_by_size "
+            "ON results (size, kind, model_version, category_hash)"
+        )
+        self._conn.commit()
+        # Stat and hash of files looked up but not found, reused by store()
+        self._misses = {}
+        self._uncommitted = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, file_path, kind, model_version, category_hash="", stat_result=None):
+        """
+        Return the cached (label, score) for a file, or None on a miss.
+        `stat_result` may be passed when the caller already has it, e.g. from os.scandir.
+        """
+        if stat_result is None:
+            stat_result = os.stat(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT label, score, size, mtime_ns FROM results "
+                "WHERE path = ? AND kind = ? AND model_version = ? AND category_hash = ?",
+                (file_path, kind, model_version, category_hash),
+            ).fetchone()
+        if row and row[2] == stat_result.st_size and row[3] == stat_result.st_mtime_ns:
+            self.hits += 1
+            return row[0], row[1]
+
+        # Path or metadata changed: fall back to the contents, which can only
+        # match an entry of the same size
+        with self._lock:
+            same_size = self._conn.execute(
+                "SELECT 1 FROM results "
+                "WHERE size = ? AND kind = ? AND model_version = ? AND category_hash = ? LIMIT 1",
+                (stat_result.st_size, kind, model_version, category_hash),
+            ).fetchone()
+        digest = row = None
+        if same_size:
+            digest = content_hash(file_path)
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT label, score FROM results "
+                    "WHERE content_hash = ? AND kind = ? AND model_version = ? AND category_hash = ? LIMIT 1",
+                    (digest, kind, model_version, category_hash),
+                ).fetchone()
+        if row:
+            self.hits += 1
+            self._write(file_path, kind, model_version, category_hash, stat_result, digest, row[0], row[1])
+            return row[0], row[1]
+
+        self.misses += 1
+        self._misses[(file_path, kind)] = (stat_result, digest)
+        return None
+
+    def store(self, file_path, kind, model_version, label, score, category_hash=""):
+        """Record the classification result for a file, hashing it if lookup() did not."""
+        stat_result, digest = self._misses.pop((file_path, kind), (None, None))
+        if stat_result is None:
+            stat_result = os.stat(file_path)
+        if digest is None:
+            digest = content_hash(file_path)
+        self._write(file_path, kind, model_version, category_hash, stat_result, digest, label, score)
+
+    def _write(self, file_path, kind, model_version, category_hash, stat_result, digest, label, score):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_path, kind, model_version, category_hash, stat_result.st_size,
+                 stat_result.st_mtime_ns, digest, str(label), float(score)),
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= COMMIT_EVERY:
+                self._conn.commit()
+                self._uncommitted = 0
+
+    def prune(self, kind, model_version):
+        """Delete entries of a kind produced by any other model version."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM results WHERE kind = ? AND model_version != ?",
+                (kind, model_version),
+            )
+            self._conn.commit()
+
+    def flush(self):
+        """Commit pending writes, e.g. after a batch when the cache stays open."""
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        """Commit pending writes and close the database."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,141 @@
+import fnmatch
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+class DirectoryScanner:
+    """
+    Streams the files under a directory using os.scandir.
+    Files are yielded as os.DirEntry objects as soon as they are found, so
+    processing can start before the scan finishes, and callers can use the
+    stat data cached on the entry instead of stat-ing the file again.
+    `found` is the running number of files yielded and `done` is set once the
+    whole tree has been scanned.
+    Args:
+        root (str): Directory to scan
+        recursive (bool): Descend into subdirectories
+        include (list, optional): Glob patterns; only matching files are yielded
+        exclude (list, optional): Glob patterns for files and directories to skip
+        skip_dirs (list, optional): Directories that are never entered, such as
+            folders already organized by a previous run
+        follow_symlinks (bool): Descend into symlinked directories
+    Patterns are matched against both the name and the path relative to root.
+    """
+
+    def __init__(self, root, recursive=False, include=None, exclude=None, skip_dirs=None,
+                 follow_symlinks=False):
+        self.root = root
+        self.recursive = recursive
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.skip_dirs = {os.path.normcase(os.path.realpath(d)) for d in (skip_dirs or [])}
+        self.follow_symlinks = follow_symlinks
+        self.found = 0
+        self.scanned_dirs = 0
+        self.done = False
+
+    def _matches(self, patterns, name, rel_path):
+        return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern)
+                   for pattern in patterns)
+
+    def _skip_dir(self, entry, rel_path):
+        if self.exclude and self._matches(self.exclude, entry.name, rel_path):
+            return True
+        return os.path.normcase(os.path.realpath(entry.path)) in self.skip_dirs
+
+    def enters(self, dir_path):
+        """Whether a scan descends into dir_path, a directory under root."""
+        rel_dir = os.path.relpath(dir_path, self.root)
+        if rel_dir == os.curdir:
+            return True
+        parts = rel_dir.split(os.sep)
+        if parts[0] == os.pardir or not self.recursive:
+            return False
+        current, rel_dir = self.root, ""
+        for part in parts:
+            current = os.path.join(current, part)
+            rel_dir = f"{rel_dir}/{part}" if rel_dir else part
+            if self.exclude and self._matches(self.exclude, part, rel_dir):
+                return False
+            if os.path.normcase(os.path.realpath(current)) in self.skip_dirs:
+                return False
+        return True
+
+    def accepts(self, path):
+        """
+        Whether a scan would yield the file at `path`; used to filter paths
+        reported by a file watcher without rescanning.
+        """
+        rel_path = os.path.relpath(path, self.root)
+        if rel_path.split(os.sep)[0] == os.pardir or not self.enters(os.path.dirname(path)):
+            return False
+        name, rel_path = os.path.basename(path), rel_path.replace(os.sep, "/")
+        if self.include and not self._matches(self.include, name, rel_path):
+            return False
+        return not (self.exclude and self._matches(self.exclude, name, rel_path))
+
+    def __iter__(self):
+        self.found = 0
+        self.scanned_dirs = 0
+        self.done = False
+        # Directories still to scan, as (path, path relative to root)
+        pending = [(self.root, "")]
+        while pending:
+            dir_path, rel_dir = pending.pop()
+            try:
+                with os.scandir(dir_path) as entries:
+                    subdirs = []
+                    for entry in entries:
+                        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        try:
+                            if entry.is_file():
+                                if self.include and not self._matches(self.include, entry.name, rel_path):
+                                    continue
+                                if self.exclude and self._matches(self.exclude, entry.name, rel_path):
+                                    continue
+                                self.found += 1
+                                yield entry
+                            elif (self.recursive and entry.is_dir(follow_symlinks=self.follow_symlinks)
+                                  and not self._skip_dir(entry, rel_path)):
+                                subdirs.append((entry.path, rel_path))
+                        except OSError as e:
+                            logger.error("Error reading %s: %s", entry.path, e)
+            except OSError as e:
+                logger.error("Error scanning %s: %s", dir_path, e)
+                continue
+            self.scanned_dirs += 1
+            # Reversed so subdirectories are visited in listing order
+            pending.extend(reversed(subdirs))
+        self.done = True
+
+def prefetch(iterable, max_items=100000):
+    """
+    Consume an iterable on a background thread, buffering up to max_items.
+    Used with a DirectoryScanner so the scan keeps running ahead of slower
+    processing and its `found` count approaches the real total early.
+    """
+    buffer = queue.Queue(maxsize=max_items)
+    done = object()
+    errors = []
+
+    def fill():
+        try:
+            for item in iterable:
+                buffer.put(item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            buffer.put(done)
+
+    thread = threading.Thread(target=fill, name="filezen-scan", daemon=True)
+    thread.start()
+    while True:
+        item = buffer.get()
+        if item is done:
+            break
+        yield item
+    if errors:
+        raise errors[0]
@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from placement import Placer, JOURNAL_FILE, PARTIAL_SUFFIX
+
+class JournalRecoveryTest(unittest.TestCase):
+    """A move interrupted between copying and deleting the source is finished by the next Placer."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, "photo.jpg")
+        self.destination = os.path.join(self.root, "organized")
+        self.target = os.path.join(self.destination, "images", "photo.jpg")
+        os.makedirs(os.path.dirname(self.target))
+        with open(self.source, "wb") as f:
+            f.write(b"x" * 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write_journal(self, *entries):
+        with open(os.path.join(self.destination, JOURNAL_FILE), "w", encoding="utf-8") as journal:
+            for entry in entries:
+                journal.write(json.dumps(entry) + "\n")
+
+    def copy_to_target(self):
+        shutil.copy2(self.source, self.target)
+        stat = os.stat(self.source)
+        os.utime(self.target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    def test_completed_copy_deletes_source(self):
+        self.copy_to_target()
+        self.write_journal({"source": self.source, "target": self.target})
+        Placer(self.destination, should_copy=False)
+        self.assertFalse(os.path.exists(self.source))
+        self.assertTrue(os.path.exists(self.target))
+        self.assertFalse(os.path.exists(os.path.join(self.destination, JOURNAL_FILE)))
+
+    def test_changed_source_is_kept(self):
+        self.copy_to_target()
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+        self.write_journal({"source": self.source, "target": self.target})
+        Placer(self.destination, should_copy=False)
+        self.assertTrue(os.path.exists(self.source))
+        self.assertTrue(os.path.exists(self.target))
+
+    def test_partial_copy_is_removed(self):
+        with open(self.target + PARTIAL_SUFFIX, "wb") as f:
+            f.write(b"x" * 10)
+        self.write_journal({"source": self.source, "target": self.target})
+        Placer(self.destination, should_copy=False)
+        self.assertTrue(os.path.exists(self.source))
+        self.assertFalse(os.path.exists(self.target + PARTIAL_SUFFIX))
+
+    def test_finished_move_is_ignored(self):
+        self.copy_to_target()
+        self.write_journal({"source": self.source, "target": self.target}, {"done": self.target})
+        Placer(self.destination, should_copy=False)
+        self.assertTrue(os.path.exists(self.source))
+
+class ReusedPlacerTest(unittest.TestCase):
+    """A Placer kept across runs sees files added to or removed from the destination in between."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.destination = os.path.join(self.root, "organized")
+        self.placer = Placer(self.destination, should_copy=True)
+
+    def tearDown(self):
+        self.placer.close()
+        shutil.rmtree(self.root)
+
+    def make_source(self, name):
+        path = os.path.join(self.root, name)
+        with open(path, "w") as f:
+            f.write(name)
+        return path
+
+    def test_targets_are_checked_after_close(self):
+        source = self.make_source("a.txt")
+        target = os.path.join(self.destination, "documents", "a.txt")
+        self.assertEqual(self.placer.place(source, target), "copied")
+        self.assertEqual(self.placer.place(source, target), "existing")
+        self.placer.close()
+
+        os.unlink(target)
+        self.assertEqual(self.placer.place(source, target), "copied")
+        self.placer.close()
+
+        other = os.path.join(self.destination, "documents", "b.txt")
+        with open(other, "w") as f:
+            f.write("not ours")
+        self.assertEqual(self.placer.place(self.make_source("b.txt"), other), "existing")
+        with open(other) as f:
+            self.assertEqual(f.read(), "not ours")
+
+if __name__ == "__main__":
+    unittest.main()
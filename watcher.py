@@ -0,0 +1,333 @@
+"""
+Watch a folder and organize files as they land in it.
+
+New files are picked up with inotify on Linux and by periodic rescans
+elsewhere (or with use_inotify=False, e.g. on network shares, which do not
+report remote changes). A file is handed on only once its size and
+modification time have stopped changing, and files that became ready
+together are organized as one micro-batch.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from organizer import organize_files, open_result_cache, default_text_categories, ORGANIZED_FOLDERS
+from placement import Placer
+from scanner import DirectoryScanner
+
+logger = logging.getLogger(__name__)
+
+# Seconds a file's size and mtime must stay unchanged before it is organized
+SETTLE_SECONDS = 1.0
+# Files created but not yet closed by their writer must stay unchanged this long
+OPEN_FILE_SETTLE_SECONDS = 30.0
+# Seconds between rescans when polling
+POLL_INTERVAL = 2.0
+# Most files organized in one batch
+MAX_BATCH = 256
+
+# Temporary names used by browsers, office suites and copy tools while writing
+PARTIAL_SUFFIXES = ('.part', '.partial', '.crdownload', '.download', '.tmp', '.temp', '.filepart', '.swp')
+PARTIAL_PREFIXES = ('~$', '.~lock.', '.#')
+
+def is_partial_name(name):
+    """Whether a file name marks a download or document still being written."""
+    lower = name.lower()
+    return lower.endswith(PARTIAL_SUFFIXES) or lower.startswith(PARTIAL_PREFIXES)
+
+def _signature(path):
+    stat_result = os.stat(path)
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+class _Inotify:
+    """Minimal inotify binding through ctypes (Linux only)."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.dirs = {}
+
+    def add_watch(self, path):
+        wd = self._add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch {path}: {os.strerror(errno)}")
+        self.dirs[wd] = path
+
+    def read(self, timeout):
+        """Wait up to timeout seconds; return a list of (directory, name, mask) events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_size = self._EVENT.unpack_from(data, offset)
+                offset += self._EVENT.size
+                name = os.fsdecode(data[offset:offset + name_size].rstrip(b"\0"))
+                offset += name_size
+                if mask & self.IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                events.append((self.dirs.get(wd), name, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+class Watcher:
+    """
+    Reports files that appear or change under a folder, once they are complete.
+    Args:
+        root (str): Folder to watch
+        recursive, include, exclude, skip_dirs: As for DirectoryScanner
+        settle_seconds (float): How long a file must stay unchanged
+        poll_interval (float): Seconds between rescans when polling
+        use_inotify (bool, optional): Force inotify on or off; by default it is
+            used where available
+    Files already present when the watcher is created are not reported.
+    """
+
+    def __init__(self, root, recursive=False, include=None, exclude=None, skip_dirs=None,
+                 settle_seconds=SETTLE_SECONDS, poll_interval=POLL_INTERVAL, use_inotify=None):
+        self.root = root
+        self.scanner = DirectoryScanner(root, recursive=recursive, include=include,
+                                        exclude=exclude, skip_dirs=skip_dirs)
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        # Files organized or present at start, with their (size, mtime_ns)
+        self._known = {}
+        # Files waiting to settle: path -> [size, mtime_ns, unchanged since, closed by writer]
+        self._pending = {}
+
+        self._inotify = None
+        if use_inotify is not False and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                self._watch_tree(root)
+            except (OSError, AttributeError) as e:
+                if use_inotify:
+                    raise
+                logger.warning("inotify unavailable (%s); polling every %.1f s", e, poll_interval)
+                if self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
+        self._next_poll = time.monotonic() + poll_interval
+        self._known = self._snapshot()
+
+    @property
+    def uses_inotify(self):
+        return self._inotify is not None
+
+    def _watch_tree(self, path):
+        """Watch a directory and, when recursive, every directory below it the scanner enters."""
+        self._inotify.add_watch(path)
+        if not self.scanner.recursive:
+            return
+        for dir_path, dir_names, _ in os.walk(path):
+            dir_names[:] = [name for name in dir_names if self.scanner.enters(os.path.join(dir_path, name))]
+            for name in dir_names:
+                self._inotify.add_watch(os.path.join(dir_path, name))
+
+    def _snapshot(self):
+        snapshot = {}
+        for entry in self.scanner:
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.path] = (stat_result.st_size, stat_result.st_mtime_ns)
+        return snapshot
+
+    def stop(self):
+        self._stop.set()
+
+    def _add_pending(self, path, closed):
+        if is_partial_name(os.path.basename(path)) or not self.scanner.accepts(path):
+            return
+        try:
+            size, mtime_ns = _signature(path)
+        except OSError:
+            return
+        now = time.monotonic()
+        entry = self._pending.get(path)
+        if entry is None or (entry[0], entry[1]) != (size, mtime_ns):
+            self._pending[path] = [size, mtime_ns, now, closed or (entry is not None and entry[3])]
+        elif closed:
+            entry[3] = True
+
+    def _collect_inotify(self, timeout):
+        for dir_path, name, mask in self._inotify.read(timeout):
+            if mask & _Inotify.IN_Q_OVERFLOW or dir_path is None:
+                # Events were lost: find what changed with a rescan
+                logger.warning("inotify queue overflowed; rescanning %s", self.root)
+                self._collect_poll()
+                continue
+            path = os.path.join(dir_path, name)
+            if mask & _Inotify.IN_ISDIR:
+                if self.scanner.enters(path):
+                    try:
+                        self._watch_tree(path)
+                    except OSError as e:
+                        logger.error("Cannot watch %s: %s", path, e)
+                    # Files may have landed before the watch was added
+                    for dir_path, _, file_names in os.walk(path):
+                        for file_name in file_names:
+                            self._add_pending(os.path.join(dir_path, file_name), False)
+                continue
+            # A file that was only created may still be written to
+            self._add_pending(path, not mask & _Inotify.IN_CREATE)
+
+    def _collect_poll(self):
+        snapshot = self._snapshot()
+        for path, signature in snapshot.items():
+            if self._known.get(path) != signature:
+                self._add_pending(path, True)
+        # Forget files that are gone, so the map does not grow without bound
+        self._known = {path: sig for path, sig in self._known.items() if path in snapshot}
+
+    def _settled(self, now):
+        """Pop the pending files that stopped changing."""
+        ready = []
+        for path, entry in list(self._pending.items()):
+            try:
+                signature = _signature(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            if signature != (entry[0], entry[1]):
+                entry[0], entry[1], entry[2] = signature[0], signature[1], now
+                continue
+            settle = self.settle_seconds if entry[3] else OPEN_FILE_SETTLE_SECONDS
+            if now - entry[2] >= settle:
+                del self._pending[path]
+                if self._known.get(path) != signature:
+                    self._known[path] = signature
+                    ready.append(path)
+        return ready
+
+    def run(self, handle_batch, max_batch=MAX_BATCH):
+        """
+        Call handle_batch(paths) with each micro-batch of completed files until stop().
+        """
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if self._pending:
+                timeout = min(self.settle_seconds / 4, 0.25)
+            else:
+                timeout = 1.0
+            if self._inotify is not None:
+                self._collect_inotify(timeout)
+            else:
+                if now >= self._next_poll:
+                    self._collect_poll()
+                    self._next_poll = now + self.poll_interval
+                self._stop.wait(min(timeout, max(0.0, self._next_poll - time.monotonic())))
+
+            ready = self._settled(time.monotonic())
+            for start in range(0, len(ready), max_batch):
+                handle_batch(ready[start:start + max_batch])
+            # Moved files are gone; only files still in place need remembering
+            for path in ready:
+                if not os.path.exists(path):
+                    self._known.pop(path, None)
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+def watch_and_organize(source_path, destination_path, mode, organize_by, should_copy=True,
+                       recursive=False, include=None, exclude=None, text_categories=None,
+                       pipeline_config=None, use_result_cache=True, initial_pass=True, settle_seconds=SETTLE_SECONDS,
+                       poll_interval=POLL_INTERVAL, use_inotify=None, batch_callback=None,
+                       watcher_callback=None, use_ocr=True):
+    """
+    Organize source_path, then keep organizing new files until interrupted.
+    Takes the options of organize_files.
+    Args:
+        initial_pass (bool): Organize the files already in source_path first
+        settle_seconds, poll_interval, use_inotify: Passed to Watcher
+        batch_callback (callable, optional): batch_callback(summary) after every batch
+        watcher_callback (callable, optional): Called with the Watcher once it is
+            running, e.g. to keep it for stop()
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Source path does not exist: {source_path}")
+    os.makedirs(destination_path, exist_ok=True)
+    # Set up once for the session, so a batch of a few files costs milliseconds
+    # however large the cache and the target folders grow
+    placer = Placer(destination_path, should_copy)
+    cache = None
+    if organize_by == "Content":
+        if text_categories is None:
+            text_categories = default_text_categories()
+        if use_result_cache:
+            cache = open_result_cache(use_ocr)
+    options = dict(mode=mode, organize_by=organize_by, should_copy=should_copy, recursive=recursive,
+                   include=include, exclude=exclude, text_categories=text_categories,
+                   pipeline_config=pipeline_config, use_result_cache=use_result_cache, use_ocr=use_ocr,
+                   result_cache=cache, placer=placer)
+
+    skip_dirs = [os.path.join(destination_path, folder) for folder in ORGANIZED_FOLDERS]
+    if mode != "Separate by Folders":
+        if os.path.realpath(destination_path) == os.path.realpath(source_path):
+            # Renamed copies land next to the originals; do not rename them again
+            exclude = list(exclude or []) + ["*_(*).*"]
+        else:
+            skip_dirs.append(destination_path)
+
+    # Start watching before the initial pass so files landing during it are seen
+    watcher = Watcher(source_path, recursive=recursive, include=include, exclude=exclude,
+                      skip_dirs=skip_dirs, settle_seconds=settle_seconds,
+                      poll_interval=poll_interval, use_inotify=use_inotify)
+    if watcher_callback is not None:
+        watcher_callback(watcher)
+    if initial_pass:
+        summary = organize_files(source_path, destination_path, **options)
+        logger.info("Initial pass organized %d files in %.1f s", summary["processed"], summary["seconds"])
+        if batch_callback is not None:
+            batch_callback(summary)
+
+    def handle_batch(paths):
+        summary = organize_files(source_path, destination_path, paths=paths, **options)
+        logger.info("Organized %d new files in %.0f ms", summary["processed"], summary["seconds"] * 1000)
+        if batch_callback is not None:
+            batch_callback(summary)
+
+    logger.info("Watching %s (%s)", source_path, "inotify" if watcher.uses_inotify else "polling")
+    try:
+        watcher.run(handle_batch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        placer.close()
+        if cache is not None:
+            cache.close()